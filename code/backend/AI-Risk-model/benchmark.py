@@ -0,0 +1,269 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import numpy as np
+import requests
+from synthetic import random_shipments
+
+# Benchmark / load-test suite for the risk-model API.
+#
+#   python benchmark.py                                  # in-process, concurrency 1 8 32
+#   python benchmark.py --url http://127.0.0.1:8000      # also drive a running server over HTTP
+#   python benchmark.py --concurrency 1 16 64 --requests 5000 --output results.json
+#   python benchmark.py --compare before.json            # print deltas against an earlier run
+#
+# "inprocess" sends requests through the full FastAPI stack (routing, pydantic
+# validation, serialization) with a minimal ASGI driver, so no network is involved.
+# "http" drives a server started separately (uvicorn main:app, serve.py, ...).
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentiles(latencies):
+    samples = np.array(latencies) * 1000.0
+    return {
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "p99_ms": float(np.percentile(samples, 99)),
+        "mean_ms": float(samples.mean()),
+        "max_ms": float(samples.max())
+    }
+
+
+async def asgi_post(app, path, body):
+    """POST body to an ASGI app in-process, returns (status, response body)"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"benchmark"), (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 50000), "server": ("benchmark", 80)
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    finished = asyncio.Event()
+    status, chunks = None, []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                finished.set()
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+
+def run_inprocess(app, payloads, concurrency):
+    bodies = [json.dumps(p).encode() for p in payloads]
+
+    async def drive():
+        latencies, failures = [], 0
+        position = 0
+
+        async def worker():
+            nonlocal position, failures
+            while position < len(bodies):
+                body = bodies[position]
+                position += 1
+                start = time.perf_counter()
+                status, response = await asgi_post(app, "/predict/", body)
+                latencies.append(time.perf_counter() - start)
+                if status != 200 or b'"error"' in response:
+                    failures += 1
+
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        return latencies, failures
+
+    return asyncio.run(drive())
+
+
+def run_http(url, payloads, concurrency):
+    local = threading.local()
+    lock = threading.Lock()
+    latencies, failures = [], [0]
+
+    def post(payload):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            response = session.post(f"{url}/predict/", json=payload, timeout=30)
+            ok = response.status_code == 200 and "error" not in response.json()
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                failures[0] += 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(post, payloads))
+    return latencies, failures[0]
+
+
+def measure(mode, run, payloads, concurrency, warmup):
+    """Send payloads[:warmup] untimed, then time the rest"""
+    run(payloads[:warmup], concurrency)
+    payloads = payloads[warmup:]
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    latencies, failures = run(payloads, concurrency)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "requests": len(payloads),
+        "failures": failures,
+        "rps": len(payloads) / wall,
+        "wall_seconds": wall,
+        "client_process_cpu_seconds": cpu,
+        **percentiles(latencies)
+    }
+
+
+def stage_profile(main, payloads):
+    """
+    CPU and wall time of each step of a single-row /predict/ call, measured directly
+    on the active bundle: validation, preprocessing, DMatrix creation, booster predict.
+    """
+    import xgboost as xgb
+    bundle = main.bundle
+    stages = {}
+
+    def timed(name, fn, *args):
+        cpu, wall = time.process_time_ns(), time.perf_counter_ns()
+        result = fn(*args)
+        entry = stages.setdefault(name, {"cpu_ns": 0, "wall_ns": 0})
+        entry["cpu_ns"] += time.process_time_ns() - cpu
+        entry["wall_ns"] += time.perf_counter_ns() - wall
+        return result
+
+    for payload in payloads:
+        record = timed("validation", lambda p: main.InputData(**p), payload)
+        X = timed("preprocessing", bundle.preprocess, [record])
+        if bundle.fused_model is not None:
+            timed("predict_fused", bundle.fused_model.inplace_predict, X)
+            continue
+        dmatrix = timed("dmatrix", xgb.DMatrix, X)
+        for label, model in bundle.models.items():
+            timed(f"predict[{label}]", model.predict, dmatrix)
+
+    total_cpu = sum(s["cpu_ns"] for s in stages.values()) or 1
+    return {
+        name: {
+            "cpu_us_per_call": s["cpu_ns"] / len(payloads) / 1000.0,
+            "wall_us_per_call": s["wall_ns"] / len(payloads) / 1000.0,
+            "cpu_share": s["cpu_ns"] / total_cpu
+        }
+        for name, s in stages.items()
+    }
+
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=current_dir,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    import xgboost
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "xgboost": xgboost.__version__,
+        "cpu_count": os.cpu_count(),
+        "env": {k: v for k, v in os.environ.items() if k.startswith("RISK_")}
+    }
+
+
+def compare(previous, current):
+    before = {(r["mode"], r["concurrency"]): r for r in previous["runs"]}
+    print("\nChange vs", previous["meta"].get("commit") or "previous run")
+    for run in current["runs"]:
+        old = before.get((run["mode"], run["concurrency"]))
+        if old is None:
+            continue
+        deltas = [
+            f"{key}={run[key]:.3f} ({(run[key] - old[key]) / old[key]:+.1%})"
+            for key in ("p50_ms", "p99_ms", "rps") if old[key]
+        ]
+        print(f"  {run['mode']:9s} c={run['concurrency']:<4d} " + "  ".join(deltas))
+
+
+def print_run(run):
+    print(f"{run['mode']:9s} c={run['concurrency']:<4d} n={run['requests']:<6d} "
+          f"p50={run['p50_ms']:.3f}ms p95={run['p95_ms']:.3f}ms p99={run['p99_ms']:.3f}ms "
+          f"rps={run['rps']:.0f} failures={run['failures']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the risk-model API")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per concurrency level")
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--url", help="Also benchmark a running server over HTTP, e.g. http://127.0.0.1:8000")
+    parser.add_argument("--http-only", action="store_true", help="Skip the in-process runs")
+    parser.add_argument("--unique", action="store_true",
+                        help="Unique payload per request (defeats the response cache)")
+    parser.add_argument("--output", default=os.path.join(current_dir, "benchmark_results.json"))
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    seeds = iter(range(1, 1000))
+
+    def workload():
+        # Without --unique a pool of 200 shipments is cycled, like dashboards re-checking
+        # trucks; with --unique every run gets fresh payloads so no run hits the cache
+        if args.unique:
+            return random_shipments(args.warmup + args.requests, seed=next(seeds))
+        pool = random_shipments(200, seed=1)
+        return [pool[i % len(pool)] for i in range(args.warmup + args.requests)]
+
+    results = {"meta": metadata(), "runs": []}
+
+    if not args.http_only:
+        import main
+        results["stages"] = stage_profile(main, workload()[:1000])
+        print("Per-call stage cost (single row):")
+        for name, s in results["stages"].items():
+            print(f"  {name:28s} cpu={s['cpu_us_per_call']:8.1f}us  wall={s['wall_us_per_call']:8.1f}us  "
+                  f"share={s['cpu_share']:.1%}")
+        for concurrency in args.concurrency:
+            run = measure("inprocess", lambda p, c: run_inprocess(main.app, p, c),
+                          workload(), concurrency, args.warmup)
+            results["runs"].append(run)
+            print_run(run)
+
+    if args.url:
+        for concurrency in args.concurrency:
+            run = measure("http", lambda p, c: run_http(args.url.rstrip("/"), p, c),
+                          workload(), concurrency, args.warmup)
+            results["runs"].append(run)
+            print_run(run)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f"Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            compare(json.load(f), results)
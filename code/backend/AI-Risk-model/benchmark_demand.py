@@ -0,0 +1,77 @@
+import argparse
+import asyncio
+import json
+import os
+import pickle
+import time
+import numpy as np
+import pandas as pd
+from benchmark import asgi_post
+from train_demand_model import DEFAULT_PROPHET
+
+# Compares the demand model served by /predict_demand/ with the Prophet model of the
+# demand service, for batches of consecutive days:
+#
+#   linear model      DemandModel.predict_dates (date parsing included)
+#   endpoint          POST /predict_demand/ through the full FastAPI stack, in-process
+#   prophet point     Prophet predict() with uncertainty_samples=0
+#   prophet full      Prophet predict() with interval sampling, as the demand service
+#                     used to run for every request
+#
+# Also reports the mean absolute difference between the two models' forecasts.
+#
+#   python benchmark_demand.py [--rows 1 365 3650] [--repeat 5] [--prophet path/to/model.pkl]
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def best_of(repeat, fn):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000.0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the demand model against Prophet")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 365, 3650])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--prophet", default=DEFAULT_PROPHET)
+    parser.add_argument("--output", default=os.path.join(current_dir, "benchmark_demand.json"))
+    args = parser.parse_args()
+
+    import main
+    with open(args.prophet, 'rb') as f:
+        prophet = pickle.load(f)
+    point = pickle.loads(pickle.dumps(prophet))
+    point.uncertainty_samples = 0
+
+    rng = np.random.default_rng(3)
+    results = []
+    for n in args.rows:
+        ds = pd.date_range("2024-01-01", periods=n)
+        dates = ds.strftime("%d.%m.%Y").tolist()
+        temperatures = np.round(rng.uniform(-5.0, 40.0, n), 1)
+        frame = pd.DataFrame({"ds": ds, "temperature": temperatures})
+        body = json.dumps({"dates": dates, "temperatures": temperatures.tolist()}).encode()
+
+        linear = main.demand_model.predict_dates(dates, temperatures)
+        reference = np.expm1(point.predict(frame)["yhat"].to_numpy())
+        run = {
+            "rows": n,
+            "linear_ms": best_of(args.repeat, lambda: main.demand_model.predict_dates(dates, temperatures)),
+            "endpoint_ms": best_of(args.repeat, lambda: asyncio.run(asgi_post(main.app, "/predict_demand/", body))),
+            "prophet_point_ms": best_of(args.repeat, lambda: point.predict(frame)),
+            "prophet_full_ms": best_of(args.repeat, lambda: prophet.predict(frame)),
+            "mean_abs_difference": float(np.mean(np.abs(linear - reference)))
+        }
+        results.append(run)
+        print(f"rows={n:<5d} linear={run['linear_ms']:8.3f}ms endpoint={run['endpoint_ms']:8.3f}ms "
+              f"prophet point={run['prophet_point_ms']:8.1f}ms full={run['prophet_full_ms']:8.1f}ms "
+              f"|linear - prophet|={run['mean_abs_difference']:.2f}")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f"Results saved to {args.output}")
@@ -0,0 +1,47 @@
+import argparse
+import json
+import time
+import numpy as np
+import xgboost as xgb
+import main
+from fused_model import fuse_boosters
+from synthetic import random_shipments
+
+# Compares the per-label booster loop with the fused multi-target booster.
+# Usage: python benchmark_inference.py [--batch-sizes 1 64 4096] [--iterations 200]
+
+def per_label(X):
+    dmatrix = xgb.DMatrix(X)
+    return [model.predict(dmatrix) for model in main.bundle.models.values()]
+
+def timings(fn, X, iterations, warmup=5):
+    for _ in range(warmup):
+        fn(X)
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(X)
+        samples.append(time.perf_counter() - start)
+    samples = np.array(samples) * 1000.0
+    return {"p50_ms": float(np.percentile(samples, 50)), "p99_ms": float(np.percentile(samples, 99))}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 64, 4096])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    fused = fuse_boosters(list(main.bundle.models.values()))
+    records = [main.InputData(**s) for s in random_shipments(max(args.batch_sizes))]
+    X_all = main.bundle.feature_pipeline.transform_many(records)
+
+    results = []
+    for n in args.batch_sizes:
+        X = X_all[:n]
+        looped = timings(per_label, X, args.iterations)
+        packed = timings(fused.inplace_predict, X, args.iterations)
+        results.append({"batch_size": n, "per_label": looped, "fused": packed})
+        print(f"batch={n:5d}  per_label p50={looped['p50_ms']:.3f}ms p99={looped['p99_ms']:.3f}ms  "
+              f"fused p50={packed['p50_ms']:.3f}ms p99={packed['p99_ms']:.3f}ms")
+
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,40 @@
+import sys
+import numpy as np
+import xgboost as xgb
+import main
+from synthetic import random_shipments
+
+# Checks that the compiled feature pipeline produces exactly the same model input
+# and the same booster outputs as the original pandas + sklearn path.
+# Usage: python check_feature_parity.py [n_rows]
+
+def check_parity(n_rows):
+    # Unknown categories are ignored by the encoder and must be ignored here too
+    records = [main.InputData(**s) for s in random_shipments(n_rows, seed=42, unknown_rate=0.1)]
+
+    # xgb.DMatrix stores float32, so the reference is the pandas matrix cast to float32
+    expected = main.bundle.pandas_preprocess(records).astype(np.float32)
+    batch = main.bundle.feature_pipeline.transform_many(records)
+    single = np.vstack([main.bundle.feature_pipeline.transform_one(r).copy() for r in records])
+
+    failures = 0
+    for name, X in [("transform_many", batch), ("transform_one", single)]:
+        if not np.array_equal(X, expected):
+            rows = np.where((X != expected).any(axis=1))[0]
+            print(f"FAIL {name}: {len(rows)} rows differ, first at index {rows[0]}")
+            failures += 1
+            continue
+
+        reference = xgb.DMatrix(main.bundle.pandas_preprocess(records))
+        compiled = xgb.DMatrix(X)
+        for label, model in main.bundle.models.items():
+            if not np.array_equal(model.predict(reference), model.predict(compiled)):
+                print(f"FAIL {name}: predictions differ for {label}")
+                failures += 1
+        print(f"{name}: {'OK' if not failures else 'FAIL'} ({n_rows} rows)")
+
+    return failures
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    sys.exit(1 if check_parity(n) else 0)
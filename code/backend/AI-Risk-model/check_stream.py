@@ -0,0 +1,40 @@
+import json
+import sys
+from fastapi.testclient import TestClient
+import main
+from synthetic import random_shipments
+
+# Checks /predict_stream/ framing: a valid manifest ends with its summary line, and a
+# manifest that cannot be read (here a CSV that is not UTF-8) still ends the stream
+# with an error line carrying the summary, and counts in risk_errors_total.
+# Usage: python check_stream.py
+
+def stream_lines(client, body, fmt):
+    response = client.post(f"/predict_stream/?format={fmt}", content=body)
+    return [json.loads(line) for line in response.text.splitlines() if line.strip()]
+
+def check_stream():
+    client = TestClient(main.app)
+    failures = 0
+
+    shipments = random_shipments(25, seed=7)
+    lines = stream_lines(client, "".join(json.dumps(s) + "\n" for s in shipments).encode("utf-8"), "ndjson")
+    if lines[-1] != {"summary": {"rows": 25, "errors": 0}} or len(lines) != 26:
+        print(f"FAIL valid manifest: last line {lines[-1] if lines else None}, {len(lines)} lines")
+        failures += 1
+
+    errors_before = main.errors.values.get(("/predict_stream/",), 0)
+    lines = stream_lines(client, b"Weather_Condition,Distance_km\n\xff\xfe,12\n", "csv")
+    last = lines[-1] if lines else {}
+    if "error" not in last or "summary" not in last:
+        print(f"FAIL unreadable manifest: last line {last}")
+        failures += 1
+    if main.errors.values.get(("/predict_stream/",), 0) != errors_before + 1:
+        print("FAIL unreadable manifest: error not counted")
+        failures += 1
+
+    print(f"predict_stream: {'OK' if not failures else 'FAIL'}")
+    return failures
+
+if __name__ == "__main__":
+    sys.exit(1 if check_stream() else 0)
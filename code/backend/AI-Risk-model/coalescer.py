@@ -0,0 +1,75 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from metrics import Histogram
+
+
+class PredictCoalescer:
+    """
+    Collects concurrent /predict/ calls for up to window_ms (or until max_batch_size
+    requests are waiting), scores them as one matrix in a worker thread and resolves
+    each caller's future with its own result.
+
+    score_batch(records) must return one result per record, in order.
+    """
+
+    def __init__(self, score_batch, window_ms=2.0, max_batch_size=64, workers=1):
+        self.score_batch = score_batch
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="coalescer")
+        self.pending = []
+        self.flush_handle = None
+
+        self.batch_sizes = Histogram([1, 2, 4, 8, 16, 32, 64, 128, 256, 512])
+        self.queue_wait_ms = Histogram([0.5, 1, 2, 5, 10, 25, 50, 100, 250, 1000])
+
+    async def submit(self, record):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((record, future, time.perf_counter()))
+
+        if len(self.pending) >= self.max_batch_size:
+            self._flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        asyncio.ensure_future(self._run(batch))
+
+    def _score(self, batch):
+        # Runs in the worker thread: queue wait includes time spent behind a busy worker
+        now = time.perf_counter()
+        self.batch_sizes.observe(len(batch))
+        for _, _, enqueued in batch:
+            self.queue_wait_ms.observe((now - enqueued) * 1000.0)
+        return self.score_batch([record for record, _, _ in batch])
+
+    async def _run(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, self._score, batch)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "window_ms": self.window * 1000.0,
+            "max_batch_size": self.max_batch_size,
+            "pending": len(self.pending),
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot()
+        }
@@ -0,0 +1,80 @@
+import json
+import re
+from datetime import date
+import numpy as np
+
+DATE_PATTERN = re.compile(r"(\d\d)\.(\d\d)\.(\d{4})")
+
+
+def parse_days(dates):
+    """'dd.mm.yyyy' strings -> datetime64[D] array; raises ValueError on a bad date"""
+    iso = []
+    for d in dates:
+        match = DATE_PATTERN.fullmatch(d) if isinstance(d, str) else None
+        if match is None:
+            raise ValueError(f"Date {d!r} does not match the format dd.mm.yyyy")
+        day, month, year = match.groups()
+        iso.append(f"{year}-{month}-{day}")
+    # numpy parses ISO dates in C and rejects impossible ones (31.02.2024)
+    return np.array(iso, dtype="datetime64[D]")
+
+
+def calendar_features(days, temperatures, origin, yearly_order):
+    """
+    Feature matrix for datetime64[D] days: intercept, linear trend (years since origin),
+    yearly Fourier terms, day-of-week indicators (Monday is the baseline) and temperature.
+    Shared by training and serving so both build exactly the same columns.
+    """
+    day_numbers = days.astype(np.int64).astype(np.float64)
+    trend = (day_numbers - float(np.datetime64(origin, "D").astype(np.int64))) / 365.25
+    angles = 2.0 * np.pi * np.outer(day_numbers / 365.25, np.arange(1, yearly_order + 1))
+    # 1970-01-01 was a Thursday
+    weekday = (days.astype(np.int64) + 3) % 7
+    weekdays = (weekday[:, None] == np.arange(1, 7)).astype(np.float64)
+    return np.column_stack([
+        np.ones(len(days)), trend, np.sin(angles), np.cos(angles), weekdays,
+        np.asarray(temperatures, dtype=np.float64)
+    ])
+
+
+class DemandModel:
+    """
+    Linear model of log1p(daily demand) on calendar features and temperature, trained
+    offline with train_demand_model.py. Scoring a batch is one matrix product.
+    """
+
+    def __init__(self, coefficients, origin, yearly_order, default_temperature, metadata=None):
+        self.coefficients = np.asarray(coefficients, dtype=np.float64)
+        self.origin = origin
+        self.yearly_order = int(yearly_order)
+        self.default_temperature = float(default_temperature)
+        self.metadata = metadata or {}
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({
+                "coefficients": self.coefficients.tolist(),
+                "origin": self.origin,
+                "yearly_order": self.yearly_order,
+                "default_temperature": self.default_temperature,
+                "metadata": self.metadata
+            }, f, indent=4)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            spec = json.load(f)
+        return cls(spec["coefficients"], spec["origin"], spec["yearly_order"],
+                   spec["default_temperature"], spec.get("metadata"))
+
+    def predict(self, days, temperatures=None):
+        """Demand per day (original scale, never negative); temperatures default to the training mean"""
+        if temperatures is None:
+            temperatures = np.full(len(days), self.default_temperature)
+        X = calendar_features(days, temperatures, self.origin, self.yearly_order)
+        return np.maximum(np.expm1(X @ self.coefficients), 0.0)
+
+    def predict_dates(self, dates=None, temperatures=None):
+        """Same as predict for 'dd.mm.yyyy' strings; no dates means today"""
+        days = parse_days(dates) if dates is not None else np.array([date.today()], dtype="datetime64[D]")
+        return self.predict(days, temperatures)
@@ -0,0 +1,96 @@
+import threading
+import numpy as np
+
+
+class CompiledFeaturePipeline:
+    """
+    Pandas-free replacement for encoder.transform + scaler.transform + np.hstack.
+
+    The fitted OneHotEncoder is turned into one {category: column} lookup table per
+    categorical field and the StandardScaler into plain mean/scale lists, so a request
+    can be written straight into a float32 row without building a DataFrame.
+    Values are computed in float64 exactly like sklearn and only then cast to float32,
+    which is what xgb.DMatrix does with the float64 matrix of the pandas path.
+    """
+
+    def __init__(self, encoder, scaler, categorical_fields, numerical_fields):
+        if getattr(encoder, "drop", None) is not None:
+            raise ValueError("Encoders fitted with drop= are not supported")
+        if getattr(encoder, "_infrequent_enabled", False):
+            raise ValueError("Encoders with infrequent categories are not supported")
+        if len(encoder.categories_) != len(categorical_fields):
+            raise ValueError("categorical_fields does not match the encoder")
+
+        self.categorical_fields = list(categorical_fields)
+        self.numerical_fields = list(numerical_fields)
+        self.ignore_unknown = encoder.handle_unknown != "error"
+
+        # One lookup table per categorical field: category -> output column
+        self.lookups = []
+        offset = 0
+        for categories in encoder.categories_:
+            self.lookups.append({c: offset + i for i, c in enumerate(categories)})
+            offset += len(categories)
+        self.n_categorical = offset
+
+        n_numerical = len(self.numerical_fields)
+        self.mean = list(scaler.mean_) if scaler.with_mean else [0.0] * n_numerical
+        self.scale = list(scaler.scale_) if scaler.with_std else [1.0] * n_numerical
+        if len(self.mean) != n_numerical:
+            raise ValueError("numerical_fields does not match the scaler")
+        self._mean = np.asarray(self.mean, dtype=np.float64)
+        self._scale = np.asarray(self.scale, dtype=np.float64)
+
+        self.n_features = self.n_categorical + n_numerical
+        self._local = threading.local()
+
+    def _column(self, field, lookup, value):
+        column = lookup.get(value)
+        if column is None and not self.ignore_unknown:
+            raise ValueError(f"Found unknown category {value!r} in {field}")
+        return column
+
+    def transform_into(self, data, out):
+        """Write one InputData into a preallocated float32 row of n_features"""
+        out[:self.n_categorical] = 0.0
+        for field, lookup in zip(self.categorical_fields, self.lookups):
+            column = self._column(field, lookup, getattr(data, field))
+            if column is not None:
+                out[column] = 1.0
+
+        offset = self.n_categorical
+        for j, field in enumerate(self.numerical_fields):
+            out[offset + j] = (float(getattr(data, field)) - self.mean[j]) / self.scale[j]
+        return out
+
+    def transform_one(self, data):
+        """
+        Transform a single InputData into a (1, n_features) float32 matrix.
+        The buffer is preallocated per thread and reused, so the result must be
+        consumed (e.g. copied into a DMatrix) before the next call on the same thread.
+        """
+        row = getattr(self._local, "row", None)
+        if row is None:
+            row = np.zeros((1, self.n_features), dtype=np.float32)
+            self._local.row = row
+        self.transform_into(data, row[0])
+        return row
+
+    def transform_many(self, records):
+        """Transform a list of InputData into a new (n, n_features) float32 matrix"""
+        n = len(records)
+        X = np.zeros((n, self.n_features), dtype=np.float32)
+        rows = np.arange(n)
+
+        for field, lookup in zip(self.categorical_fields, self.lookups):
+            columns = [self._column(field, lookup, getattr(r, field)) for r in records]
+            known = [i for i, c in enumerate(columns) if c is not None]
+            if known:
+                X[rows[known], [columns[i] for i in known]] = 1.0
+
+        numerical = np.array(
+            [[getattr(r, field) for field in self.numerical_fields] for r in records],
+            dtype=np.float64
+        ).reshape(n, len(self.numerical_fields))
+        X[:, self.n_categorical:] = (numerical - self._mean) / self._scale
+        return X
@@ -0,0 +1,70 @@
+import copy
+import json
+import math
+import numpy as np
+import xgboost as xgb
+
+
+def _load_json(booster):
+    return json.loads(booster.save_raw("json"))
+
+def fuse_boosters(boosters):
+    """
+    Pack several single-output binary:logistic boosters into one multi-target booster,
+    so one predict call walks every tree once and returns an (n, len(boosters)) matrix.
+
+    Iteration i of the fused model holds tree i of every input booster, tagged with its
+    target in tree_info. Each booster has its own base_score while the fused model only
+    has one, so the fused base_score is 0.5 (margin 0) and each booster's base margin is
+    folded into the leaves of its first tree - every row lands in exactly one leaf of
+    that tree, so the margin sum is unchanged (up to float32 rounding).
+    """
+    docs = [_load_json(b) for b in boosters]
+    per_target = [d["learner"]["gradient_booster"]["model"]["trees"] for d in docs]
+
+    for d in docs:
+        if d["learner"]["objective"]["name"] != "binary:logistic":
+            raise ValueError("Only binary:logistic boosters can be fused")
+        if d["learner"]["gradient_booster"]["name"] != "gbtree":
+            raise ValueError("Only gbtree boosters can be fused")
+        if d["learner"]["learner_model_param"]["num_target"] != "1":
+            raise ValueError("Only single-target boosters can be fused")
+    if len({len(trees) for trees in per_target}) != 1:
+        raise ValueError("All boosters must have the same number of trees")
+
+    trees, tree_info = [], []
+    for iteration in range(len(per_target[0])):
+        for target, target_trees in enumerate(per_target):
+            tree = copy.deepcopy(target_trees[iteration])
+            if iteration == 0:
+                base_score = float(docs[target]["learner"]["learner_model_param"]["base_score"])
+                base_margin = math.log(base_score / (1.0 - base_score))
+                for node, left in enumerate(tree["left_children"]):
+                    if left == -1:  # leaf
+                        tree["split_conditions"][node] += base_margin
+                        tree["base_weights"][node] += base_margin
+            tree["id"] = len(trees)
+            trees.append(tree)
+            tree_info.append(target)
+
+    fused = docs[0]
+    learner = fused["learner"]
+    model = learner["gradient_booster"]["model"]
+    model["trees"] = trees
+    model["tree_info"] = tree_info
+    model["iteration_indptr"] = list(range(0, len(trees) + 1, len(per_target)))
+    model["gbtree_model_param"]["num_trees"] = str(len(trees))
+    learner["learner_model_param"]["num_target"] = str(len(per_target))
+    learner["learner_model_param"]["base_score"] = "5E-1"
+
+    booster = xgb.Booster()
+    booster.load_model(bytearray(json.dumps(fused).encode("utf-8")))
+    return booster
+
+def max_abs_difference(fused, boosters, n_rows=1000, seed=0):
+    """Largest probability difference between the fused booster and the originals on random rows"""
+    rng = np.random.RandomState(seed)
+    X = rng.normal(size=(n_rows, fused.num_features())).astype(np.float32)
+    dmatrix = xgb.DMatrix(X)
+    expected = np.column_stack([b.predict(dmatrix) for b in boosters])
+    return float(np.abs(fused.inplace_predict(X) - expected).max())
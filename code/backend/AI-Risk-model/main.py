@@ -1,12 +1,28 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
-import joblib
-import numpy as np
-import xgboost as xgb
-import pandas as pd
+from fastapi import FastAPI, Request, Header
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from pydantic import BaseModel, ValidationError
 import os
+import numpy as np
+import json
+import threading
+import time
+import asyncio
+import csv
+import io
+import tempfile
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
+from coalescer import PredictCoalescer
+from demand_model import DemandModel
+from lru_cache import LRUCache
+from metrics import (
+    Counter, RequestMetricsMiddleware, request_started, request_counts, request_durations,
+    stage_timers, render_header, render_histogram
+)
+from model_bundle import (
+    ModelBundle, CANARY, output_labels, categorical_columns, numerical_columns,
+    categorical_fields, numerical_fields
+)
 
 # Initialize FastAPI
 app = FastAPI()
@@ -20,22 +36,49 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request counts and durations per route, exposed on /metrics
+app.add_middleware(RequestMetricsMiddleware)
+errors = Counter()
+
 # Get the current directory
 current_dir = os.path.dirname(os.path.abspath(__file__))
 
-# Load encoder and scaler
-encoder = joblib.load(os.path.join(current_dir, "encoder.pkl"))
-scaler = joblib.load(os.path.join(current_dir, "scaler.pkl"))
+# Directory holding encoder.pkl, scaler.pkl and the xgb_*.h5 boosters
+MODEL_DIR = os.getenv("RISK_MODEL_DIR", current_dir)
+
+# "per_label" (default) runs the four boosters one after another on the same DMatrix,
+# "fused" packs them into a single multi-target booster that is walked in one call.
+INFERENCE_MODE = os.getenv("RISK_INFERENCE_MODE", "per_label")
+
+# "compiled" (default) writes requests straight into float32 rows using lookup tables
+# built from encoder/scaler, "pandas" keeps the original DataFrame + sklearn path.
+FEATURE_PIPELINE = os.getenv("RISK_FEATURE_PIPELINE", "compiled")
+
+# Decision thresholds per label. A label is 1 when its probability is > threshold.
+THRESHOLDS_PATH = os.getenv("RISK_THRESHOLDS_PATH", os.path.join(current_dir, "thresholds.json"))
+
+# Optional materialized grid: pre-scored probabilities for a quantized input space,
+# built offline with `python risk_grid.py build`. Enable with RISK_GRID=1.
+USE_GRID = os.getenv("RISK_GRID", "0") == "1"
+GRID_PATH = os.getenv("RISK_GRID_PATH", os.path.join(current_dir, "risk_grid.npz"))
 
-# Load all models
-output_labels = ["Delivery Delay", "Accident Occurred", "Damaged Product", "Breakdown Occurred"]
-models = {}
+# Lightweight demand model behind /predict_demand/ and /predict_commands/, trained
+# offline with `python train_demand_model.py`
+DEMAND_MODEL_PATH = os.getenv("RISK_DEMAND_MODEL_PATH", os.path.join(current_dir, "demand_model.json"))
 
-for label in output_labels:
-    model_path = os.path.join(current_dir, f"xgb_{label}.h5")
-    model = xgb.Booster()
-    model.load_model(model_path)
-    models[label] = model  # Store model in dictionary
+def load_bundle():
+    return ModelBundle(
+        MODEL_DIR,
+        THRESHOLDS_PATH,
+        inference_mode=INFERENCE_MODE,
+        feature_pipeline=FEATURE_PIPELINE,
+        grid_path=GRID_PATH if USE_GRID else None
+    )
+
+# The active set of artifacts. Request handlers read this reference once and use that
+# bundle for the whole request; reload_models() replaces it in a single assignment.
+bundle = load_bundle()
+demand_model = DemandModel.load(DEMAND_MODEL_PATH) if os.path.exists(DEMAND_MODEL_PATH) else None
 
 # Define request schema
 class InputData(BaseModel):
@@ -48,68 +91,440 @@ class InputData(BaseModel):
     Loading_Weight_kg: float
     Year_of_Vehicle: int
 
+# Maximum number of shipments accepted by a single /predict_batch/ request.
+# Larger manifests must be split client-side; override with RISK_MAX_BATCH_ROWS.
+MAX_BATCH_ROWS = int(os.getenv("RISK_MAX_BATCH_ROWS", "5000"))
+
+# In-process response cache keyed on the canonicalized input. Dispatch screens
+# re-check the same truck/route/cargo on every refresh. RISK_CACHE_SIZE=0 disables it,
+# RISK_CACHE_TTL (seconds) bounds entry age. Keys include the bundle generation and the
+# cache is cleared on reload, so results of replaced models are never served.
+CACHE_SIZE = int(os.getenv("RISK_CACHE_SIZE", "10000"))
+CACHE_TTL = float(os.getenv("RISK_CACHE_TTL")) if os.getenv("RISK_CACHE_TTL") else None
+response_cache = LRUCache(CACHE_SIZE, CACHE_TTL) if CACHE_SIZE > 0 else None
+
+def cache_key(record, generation):
+    # Numeric values as float so 2000 and 2000.0 share an entry
+    return (
+        (generation,) +
+        tuple(getattr(record, field) for field in categorical_fields) +
+        tuple(float(getattr(record, field)) for field in numerical_fields)
+    )
+
+def probability_columns(records, current, use_cache=True):
+    """Per-label probability lists (in output_labels order) for a list of InputData"""
+    if response_cache is None or not use_cache:
+        return current.probability_columns(records)
+
+    with stage_timers.time("cache_lookup"):
+        keys = [cache_key(r, current.generation) for r in records]
+        rows = [response_cache.get(key) for key in keys]
+    missing = [i for i, row in enumerate(rows) if row is None]
+    if missing:
+        columns = current.probability_columns([records[i] for i in missing])
+        for j, i in enumerate(missing):
+            rows[i] = tuple(column[j] for column in columns)
+            response_cache.put(keys[i], rows[i])
+    return [list(column) for column in zip(*rows)]
+
+def score_records(records, include_probabilities=False, use_cache=True):
+    """Score a list of InputData, returns one /predict/ response dict per record"""
+    current = bundle  # one consistent set of artifacts for the whole call
+    keys = [label.replace(" ", "_") for label in output_labels]
+    cutoffs = [current.thresholds[label] for label in output_labels]
+    columns = probability_columns(records, current, use_cache)
+
+    results = []
+    for row in zip(*columns):
+        result = {key: int(p > t) for key, p, t in zip(keys, row, cutoffs)}  # Convert to 0 or 1
+        if include_probabilities:
+            result["probabilities"] = dict(zip(keys, row))
+        results.append(result)
+    return results
+
+# Opt-in request coalescing for /predict/: concurrent calls arriving within
+# RISK_COALESCE_WINDOW_MS are scored together (at most RISK_COALESCE_MAX_BATCH rows)
+# in a worker thread instead of blocking the event loop one request at a time.
+COALESCE = os.getenv("RISK_COALESCE", "0") == "1"
+COALESCE_WINDOW_MS = float(os.getenv("RISK_COALESCE_WINDOW_MS", "2"))
+COALESCE_MAX_BATCH = int(os.getenv("RISK_COALESCE_MAX_BATCH", "64"))
+coalescer = None
+
+def get_coalescer():
+    # Created lazily so it binds to the running event loop
+    global coalescer
+    if coalescer is None:
+        coalescer = PredictCoalescer(
+            lambda records: score_records(records, include_probabilities=True),
+            COALESCE_WINDOW_MS,
+            COALESCE_MAX_BATCH
+        )
+    return coalescer
+
+# Hot reload: new artifacts are loaded off the request path, checked on a canary row
+# and only then swapped in. Trigger with POST /admin/reload (guarded by
+# X-Admin-Token when RISK_ADMIN_TOKEN is set) or set RISK_WATCH_INTERVAL to a number
+# of seconds to poll the artifact files for changes. Under serve.py every worker owns
+# its bundle, so use the watcher there: it is started on application startup, which
+# runs in each worker after the fork (threads are not inherited by forked children),
+# so every worker polls and reloads itself and the parent never holds reload_lock.
+ADMIN_TOKEN = os.getenv("RISK_ADMIN_TOKEN")
+WATCH_INTERVAL = float(os.getenv("RISK_WATCH_INTERVAL", "0"))
+reload_lock = threading.Lock()
+
+def reload_models():
+    """Load, validate and atomically activate a new bundle. Returns a summary dict."""
+    global bundle
+    with reload_lock:
+        start = time.perf_counter()
+        candidate = load_bundle()
+        canary = candidate.validate(InputData(**CANARY))
+        previous, bundle = bundle, candidate
+        if response_cache is not None:
+            response_cache.clear()
+        return {
+            "reloaded": previous.fingerprint != candidate.fingerprint,
+            "generation": candidate.generation,
+            "fingerprint": candidate.fingerprint,
+            "previous_fingerprint": previous.fingerprint,
+            "canary": {label.replace(" ", "_"): p for label, p in canary.items()},
+            "seconds": time.perf_counter() - start
+        }
+
+def artifact_mtimes():
+    paths = bundle.artifact_paths + [THRESHOLDS_PATH] + ([GRID_PATH] if USE_GRID else [])
+    return [os.path.getmtime(p) if os.path.exists(p) else None for p in paths]
+
+def watch_artifacts():
+    seen = artifact_mtimes()
+    while True:
+        time.sleep(WATCH_INTERVAL)
+        current = artifact_mtimes()
+        if current == seen:
+            continue
+        # Give a deployment copying several files a moment to finish
+        time.sleep(WATCH_INTERVAL)
+        try:
+            print("Model artifacts changed, reloading:", reload_models())
+        except Exception as e:
+            print(f"Reload failed, keeping generation {bundle.generation}: {e}")
+        seen = artifact_mtimes()
+
+@app.on_event("startup")
+async def start_watcher():
+    if WATCH_INTERVAL > 0:
+        threading.Thread(target=watch_artifacts, name="artifact-watcher", daemon=True).start()
+
+def observe_validation():
+    # Time from the request entering the app until the handler runs: body parsing,
+    # routing and pydantic validation of InputData
+    started = request_started.get()
+    if started is not None:
+        stage_timers.observe("validation", time.perf_counter() - started)
+
+def parse_rows(body):
+    """Decode a JSON array or NDJSON body into a list of raw rows"""
+    text = body.decode("utf-8").strip()
+    if text.startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+def validate_rows(rows):
+    """Validate raw rows into a list of InputData"""
+    records = []
+    for i, row in enumerate(rows):
+        try:
+            records.append(InputData(**row))
+        except (ValidationError, TypeError) as e:
+            raise ValueError(f"Invalid record at index {i}: {e}")
+    return records
+
 @app.post("/predict/")
-async def predict(data: InputData):
+async def predict(data: InputData, probabilities: bool = False):
+    """
+    Predict all risk labels for one shipment. Labels are 0/1 using the per-label
+    thresholds from thresholds.json; pass ?probabilities=true to also get the raw
+    booster probabilities under "probabilities".
+    """
+    observe_validation()
     try:
-        # Convert input data into DataFrame
-        input_data = pd.DataFrame([{
-            "Weather Condition": data.Weather_Condition,
-            "Distance (km)": data.Distance_km,
-            "Traffic Level": data.Traffic_Level,
-            "Vehicle Type": data.Vehicle_Type,
-            "Driver Experience (years)": data.Driver_Experience_years,
-            "Goods Type": data.Goods_Type,
-            "Loading Weight (kg)": data.Loading_Weight_kg,
-            "Year of Vehicle": data.Year_of_Vehicle
-        }])
-
-        # Encode categorical data and scale numerical data
-        X_categorical = encoder.transform(input_data[["Weather Condition", "Traffic Level", "Vehicle Type", "Goods Type"]])
-        X_numerical = scaler.transform(input_data[["Distance (km)", "Driver Experience (years)", "Loading Weight (kg)", "Year of Vehicle"]])
-        X = np.hstack((X_categorical, X_numerical))
-
-        # Convert to DMatrix format for XGBoost
-        dmatrix = xgb.DMatrix(X)
+        if COALESCE:
+            result = await get_coalescer().submit(data)
+            if not probabilities:
+                result.pop("probabilities", None)
+            return result
 
         # Predict for all labels
-        predictions = {}
-        for label, model in models.items():
-            pred = model.predict(dmatrix)
-            predictions[label.replace(" ", "_")] = int(pred[0] > 0.5)  # Convert to 0 or 1
+        return score_records([data], include_probabilities=probabilities)[0]
+
+    except Exception as e:
+        errors.inc(("/predict/",))
+        return {"error": str(e)}
+
+@app.post("/predict_batch/")
+async def predict_batch(request: Request):
+    """
+    Score many shipments in one call. Accepts either a JSON array of InputData
+    objects or NDJSON (one InputData object per line). At most MAX_BATCH_ROWS
+    records are accepted per request.
+
+    Returns {"count": N, "predictions": [{<label>: 0/1, ..., "probabilities": {<label>: p}}]}
+    in the same order as the input.
+    """
+    try:
+        body = await request.body()
+        with stage_timers.time("validation", "batch"):
+            rows = parse_rows(body)
+            # Checked on the raw rows, so oversized batches never pay for validation
+            if len(rows) > MAX_BATCH_ROWS:
+                return {"error": f"Too many records: {len(rows)} > {MAX_BATCH_ROWS}. Split the batch."}
+            records = validate_rows(rows)
+        if not records:
+            return {"error": "No records provided"}
 
-        return predictions
+        # Up to MAX_BATCH_ROWS rows of inference, kept off the event loop like /predict_stream/
+        loop = asyncio.get_running_loop()
+        predictions = await loop.run_in_executor(None, score_records, records, True)
+        return {"count": len(predictions), "predictions": predictions}
 
     except Exception as e:
+        errors.inc(("/predict_batch/",))
         return {"error": str(e)}
 
+# Streaming scoring of large manifests: rows are processed STREAM_CHUNK_ROWS at a
+# time and results are written back as each chunk is scored. The upload is spooled
+# (in memory up to STREAM_SPOOL_BYTES, then to a temporary file) so the manifest is
+# never held in memory as a whole.
+STREAM_CHUNK_ROWS = int(os.getenv("RISK_STREAM_CHUNK_ROWS", "1000"))
+STREAM_SPOOL_BYTES = int(os.getenv("RISK_STREAM_SPOOL_BYTES", str(8 * 1024 * 1024)))
+
+# CSV headers may use either the InputData field names or the training column names
+csv_columns = dict(zip(categorical_columns + numerical_columns, categorical_fields + numerical_fields))
+
+def manifest_rows(spool, fmt):
+    """Yield (row number, raw dict or exception) from a spooled NDJSON or CSV upload"""
+    text = io.TextIOWrapper(spool, encoding="utf-8", newline="")
+    if fmt == "csv":
+        for i, row in enumerate(csv.DictReader(text)):
+            yield i, {csv_columns.get(column, column): value for column, value in row.items()}
+        return
+
+    i = 0
+    for line in text:
+        if not line.strip():
+            continue
+        try:
+            yield i, json.loads(line)
+        except ValueError as e:
+            yield i, e
+        i += 1
+
+def manifest_chunks(spool, fmt, chunk_rows):
+    chunk = []
+    for item in manifest_rows(spool, fmt):
+        chunk.append(item)
+        if len(chunk) >= chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def score_manifest_chunk(chunk, include_probabilities):
+    """Validate and score one chunk, returns (NDJSON bytes, number of rows in error)"""
+    rows, records, row_errors = [], [], {}
+    for i, row in chunk:
+        try:
+            if isinstance(row, Exception):
+                raise row
+            records.append(InputData(**row))
+            rows.append(i)
+        except (ValidationError, TypeError, ValueError) as e:
+            row_errors[i] = str(e)
+
+    # Manifests are mostly unique rows, keep them out of the response cache
+    scored = dict(zip(rows, score_records(records, include_probabilities, use_cache=False))) if records else {}
+    lines = []
+    for i, _ in chunk:
+        result = {"row": i, **scored[i]} if i in scored else {"row": i, "error": row_errors[i]}
+        lines.append(json.dumps(result))
+    return ("\n".join(lines) + "\n").encode("utf-8"), len(row_errors)
+
+@app.post("/predict_stream/")
+async def predict_stream(request: Request, probabilities: bool = False, format: str = None):
+    """
+    Score a manifest of any size. The body is NDJSON (one InputData object per line)
+    or CSV with a header row (send Content-Type: text/csv or ?format=csv). The response
+    is NDJSON streamed chunk by chunk: one {"row": i, <labels>...} or {"row": i, "error": ...}
+    object per input row, in input order, followed by a final {"summary": {...}} line.
+    """
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    if fmt not in ("csv", "ndjson"):
+        return {"error": f"Unsupported format {fmt}, use ndjson or csv"}
+
+    spool = tempfile.SpooledTemporaryFile(max_size=STREAM_SPOOL_BYTES)
+    async for data in request.stream():
+        spool.write(data)
+    spool.seek(0)
+
+    async def results():
+        loop = asyncio.get_running_loop()
+        chunks = manifest_chunks(spool, fmt, STREAM_CHUNK_ROWS)
+        total = failed = 0
+        try:
+            while True:
+                chunk = await loop.run_in_executor(None, next, chunks, None)
+                if chunk is None:
+                    break
+                body, chunk_errors = await loop.run_in_executor(None, score_manifest_chunk, chunk, probabilities)
+                total += len(chunk)
+                failed += chunk_errors
+                yield body
+            yield json.dumps({"summary": {"rows": total, "errors": failed}}) + "\n"
+        except Exception as e:
+            errors.inc(("/predict_stream/",))
+            yield json.dumps({"error": str(e), "summary": {"rows": total, "errors": failed}}) + "\n"
+        finally:
+            spool.close()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+def demand_forecast(data):
+    """
+    Forecast demand for {"date", "temperature"} or a batch {"dates": [...], "temperatures": [...]}.
+    Dates are "dd.mm.yyyy"; a missing date means today and missing (or null)
+    temperatures the training mean. Returns (demand per day, whether the request was a batch).
+    """
+    if demand_model is None:
+        raise RuntimeError(f"No demand model at {DEMAND_MODEL_PATH}, train one with train_demand_model.py")
+
+    batch = "dates" in data or "temperatures" in data
+    if batch:
+        dates, temperatures = data.get("dates"), data.get("temperatures")
+        if not isinstance(dates, list) or not dates:
+            raise ValueError("'dates' must be a non-empty list for batch requests")
+        if len(dates) > MAX_BATCH_ROWS:
+            raise ValueError(f"Batch of {len(dates)} dates exceeds the limit of {MAX_BATCH_ROWS}")
+        if temperatures is not None and len(temperatures) != len(dates):
+            raise ValueError("Length of 'dates' and 'temperatures' must match")
+    else:
+        dates = [data["date"]] if data.get("date") else None
+        temperatures = [data["temperature"]] if data.get("temperature") is not None else None
+
+    if temperatures is not None:
+        temperatures = np.asarray(
+            [demand_model.default_temperature if t is None else t for t in temperatures], dtype=float
+        )
+        if not np.isfinite(temperatures).all():
+            raise ValueError("Temperatures must be finite numbers")
+
+    with np.errstate(over="ignore"):
+        demand = demand_model.predict_dates(dates, temperatures)
+    # Extreme temperatures overflow expm1, and counts past int64 cannot be rounded
+    if not (np.isfinite(demand) & (demand < np.iinfo(np.int64).max)).all():
+        raise ValueError("Demand forecast out of range, check the temperatures")
+    return demand, batch
+
 @app.post("/predict_commands/")
 async def predict_commands(data: dict):
+    """Expected number of orders (rounded daily demand) for one day or a batch of days"""
     try:
-        # Example response - replace with actual ML model prediction
-        # This is a placeholder that returns a random number between 10 and 100
-        import random
-        predicted_commands = random.randint(10, 100)
-        return {"predicted_commands": predicted_commands}
+        demand, batch = demand_forecast(data)
+        commands = np.rint(demand).astype(int).tolist()
+        return {"predicted_commands": commands if batch else commands[0]}
     except Exception as e:
         return {"error": str(e)}
 
 @app.post("/predict_demand/")
 async def predict_demand(data: dict):
+    """Daily demand for one day or a batch of days, from the offline-trained demand model"""
     try:
-        temperature = float(data['temperature'])
-        
-        # Simple calculation based only on temperature
-        base_demand = 50  # Base demand
-        temp_factor = temperature * 0.5  # Temperature affects demand
-        
-        predicted_demand = int(base_demand + temp_factor)
-        
-        return {
-            "predicted_demand": predicted_demand
-        }
+        demand, batch = demand_forecast(data)
+        predicted = np.rint(demand).astype(int).tolist()
+        return {"predicted_demand": predicted if batch else predicted[0]}
     except Exception as e:
         return {"error": str(e)}
 
+@app.get("/thresholds")
+async def get_thresholds():
+    """Decision thresholds currently applied to each label"""
+    return {label.replace(" ", "_"): value for label, value in bundle.thresholds.items()}
+
+@app.post("/admin/reload")
+async def admin_reload(x_admin_token: str = Header(None)):
+    """Reload artifacts from RISK_MODEL_DIR in the background and swap them in"""
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        return {"error": "Invalid admin token"}
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, reload_models)
+    except Exception as e:
+        return {"error": f"Reload failed, still serving generation {bundle.generation}: {e}"}
+
+@app.get("/admin/models")
+async def admin_models():
+    """Artifacts behind the active bundle"""
+    return {
+        "generation": bundle.generation,
+        "fingerprint": bundle.fingerprint,
+        "model_dir": bundle.model_dir,
+        "inference_mode": "fused" if bundle.fused_model is not None else "per_label",
+        "grid": bundle.risk_grid is not None
+    }
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss/eviction counters of the response cache"""
+    if response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **response_cache.stats()}
+
+@app.get("/coalescer/stats")
+async def coalescer_stats():
+    """Batch-size histogram and queue wait time of the /predict/ coalescer"""
+    if not COALESCE:
+        return {"enabled": False}
+    return {"enabled": True, **get_coalescer().stats()}
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of request, stage, cache and coalescer metrics"""
+    lines = []
+
+    render_header(lines, "risk_requests_total", "counter", "HTTP requests by route and status")
+    for (path, status), count in sorted(request_counts.values.items()):
+        lines.append(f'risk_requests_total{{path="{path}",status="{status}"}} {count}')
+
+    render_header(lines, "risk_request_duration_seconds", "histogram", "Time spent in the app per request")
+    for path, histogram in sorted(request_durations.items()):
+        render_histogram(lines, "risk_request_duration_seconds", histogram.snapshot(), path=path)
+
+    render_header(lines, "risk_errors_total", "counter", "Requests answered with an error body")
+    for (path,), count in sorted(errors.values.items()):
+        lines.append(f'risk_errors_total{{path="{path}"}} {count}')
+
+    render_header(lines, "risk_stage_duration_seconds", "histogram",
+                  "Time per scoring stage (validation includes body parsing and routing)")
+    for (stage, label), histogram in sorted(stage_timers.histograms.items(), key=lambda item: (item[0][0], item[0][1] or "")):
+        render_histogram(lines, "risk_stage_duration_seconds", histogram.snapshot(), stage=stage, label=label)
+
+    if response_cache is not None:
+        stats = response_cache.stats()
+        for name in ("hits", "misses", "evictions", "expirations", "invalidations"):
+            render_header(lines, f"risk_cache_{name}_total", "counter", f"Response cache {name}")
+            lines.append(f"risk_cache_{name}_total {stats[name]}")
+        render_header(lines, "risk_cache_size", "gauge", "Entries in the response cache")
+        lines.append(f"risk_cache_size {stats['size']}")
+
+    if COALESCE and coalescer is not None:
+        render_header(lines, "risk_coalescer_batch_size", "histogram", "Requests scored per coalesced batch")
+        render_histogram(lines, "risk_coalescer_batch_size", coalescer.batch_sizes.snapshot())
+        render_header(lines, "risk_coalescer_queue_wait_ms", "histogram", "Time a request waited before scoring")
+        render_histogram(lines, "risk_coalescer_queue_wait_ms", coalescer.queue_wait_ms.snapshot())
+
+    render_header(lines, "risk_model_generation", "gauge", "Generation of the active model bundle")
+    lines.append(f"risk_model_generation {bundle.generation}")
+
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
 # Run the FastAPI app
 if __name__ == "__main__":
     import uvicorn
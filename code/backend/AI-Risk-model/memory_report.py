@@ -0,0 +1,95 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+import requests
+from synthetic import random_shipments
+
+# Compares resident memory of `uvicorn main:app --workers N` (every worker loads its own
+# copy of the artifacts) with `python serve.py --workers N` (artifacts loaded once and
+# shared copy-on-write). Linux only: reads /proc.
+#
+# Usage: python memory_report.py [--workers 1 2 4 8] [--port 8010]
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except FileNotFoundError:
+        return []
+
+
+def memory_kb(pid):
+    """(RSS, PSS) in kB; PSS splits shared pages between the processes sharing them"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0]] = int(parts[1])
+    return values["Rss:"], values["Pss:"]
+
+
+def is_worker(pid):
+    # uvicorn --workers also starts multiprocessing helper processes
+    with open(f"/proc/{pid}/cmdline", "rb") as f:
+        cmdline = f.read().replace(b"\0", b" ").decode()
+    return "resource_tracker" not in cmdline
+
+
+def measure(command, port, workers, requests_per_worker=50):
+    process = subprocess.Popen(command, cwd=current_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.time() + 120
+        while True:
+            try:
+                requests.get(f"{url}/thresholds", timeout=1)
+                break
+            except requests.ConnectionError:
+                if time.time() > deadline or process.poll() is not None:
+                    raise RuntimeError(f"Server did not start: {' '.join(command)}")
+                time.sleep(0.5)
+
+        # Give every worker the chance to handle traffic before measuring
+        pids = [p for p in children(process.pid) if is_worker(p)]
+        while 0 < len(pids) < workers and time.time() < deadline:
+            time.sleep(0.5)
+            pids = [p for p in children(process.pid) if is_worker(p)]
+        with requests.Session() as session:
+            for shipment in random_shipments(requests_per_worker * workers):
+                session.post(f"{url}/predict/", json=shipment)
+        time.sleep(1)
+
+        if not pids:
+            # uvicorn with a single worker serves from the launched process itself
+            return (0, 0), [memory_kb(process.pid)]
+        return memory_kb(process.pid), [memory_kb(pid) for pid in pids]
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--port", type=int, default=8010)
+    args = parser.parse_args()
+
+    modes = {
+        "uvicorn --workers": lambda n: [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--workers", str(n)],
+        "serve.py (pre-fork)": lambda n: [sys.executable, "serve.py", "--port", str(args.port), "--workers", str(n), "--log-level", "warning"]
+    }
+
+    print(f"{'mode':22s} {'workers':>7s} {'RSS/worker MB':>14s} {'PSS/worker MB':>14s} {'total PSS MB':>13s}")
+    for name, command in modes.items():
+        for n in args.workers:
+            parent, workers = measure(command(n), args.port, n)
+            rss = sum(r for r, _ in workers) / len(workers) / 1024
+            pss = sum(p for _, p in workers) / len(workers) / 1024
+            total = (parent[1] + sum(p for _, p in workers)) / 1024
+            print(f"{name:22s} {n:7d} {rss:14.1f} {pss:14.1f} {total:13.1f}")
@@ -0,0 +1,189 @@
+import bisect
+import contextvars
+import os
+import threading
+import time
+
+
+class Histogram:
+    """
+    Cumulative bucketed histogram (Prometheus style: a value falls in every bucket
+    whose upper bound is >= value). Safe to observe from several threads.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = sorted(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+            self.count = 0
+            self.sum = 0.0
+            self.max = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def snapshot(self):
+        """Return {"buckets": {le: cumulative count}, "count", "sum", "max", "mean"}"""
+        with self._lock:
+            cumulative, running = {}, 0
+            for bound, n in zip(self.buckets + ["+Inf"], self.counts):
+                running += n
+                cumulative[str(bound)] = running
+            return {
+                "buckets": cumulative,
+                "count": self.count,
+                "sum": self.sum,
+                "max": self.max,
+                "mean": self.sum / self.count if self.count else 0.0
+            }
+
+
+# Latency buckets in seconds, from 10us (a dict lookup) to 2.5s (a large batch)
+LATENCY_BUCKETS = [0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001,
+                   0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+
+
+class StageTimers:
+    """
+    Latency histogram per (stage, label) of the scoring path. Observing costs two
+    perf_counter calls and one locked increment, cheap enough to leave on under load;
+    RISK_METRICS=0 turns timing into a no-op.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage, label=None):
+        key = (stage, label)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(key, Histogram(LATENCY_BUCKETS))
+        return histogram
+
+    def observe(self, stage, seconds, label=None):
+        if self.enabled:
+            self.histogram(stage, label).observe(seconds)
+
+    def time(self, stage, label=None):
+        return _StageTimer(self, stage, label) if self.enabled else _NO_TIMER
+
+
+class _StageTimer:
+    __slots__ = ("timers", "stage", "label", "start")
+
+    def __init__(self, timers, stage, label):
+        self.timers, self.stage, self.label = timers, stage, label
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.timers.histogram(self.stage, self.label).observe(time.perf_counter() - self.start)
+
+
+class _NoTimer:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_TIMER = _NoTimer()
+
+
+class Counter:
+    """Monotonic counters keyed by a tuple of label values"""
+
+    def __init__(self):
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, key, amount=1):
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(**labels):
+    pairs = [f'{k}="{_escape(v)}"' for k, v in labels.items() if v is not None]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def render_histogram(lines, name, snapshot, **labels):
+    """Append one histogram snapshot in Prometheus text format"""
+    for bound, count in snapshot["buckets"].items():
+        lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {count}")
+    lines.append(f"{name}_sum{_labels(**labels)} {snapshot['sum']}")
+    lines.append(f"{name}_count{_labels(**labels)} {snapshot['count']}")
+
+
+def render_header(lines, name, kind, help_text):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+stage_timers = StageTimers(enabled=os.getenv("RISK_METRICS", "1") == "1")
+
+# perf_counter() when the current request entered the app; handlers subtract it to
+# time everything before them (body parsing, routing, pydantic validation)
+request_started = contextvars.ContextVar("request_started", default=None)
+
+# Filled by RequestMetricsMiddleware: (route, status) -> count and route -> Histogram
+request_counts = Counter()
+request_durations = {}
+_durations_lock = threading.Lock()
+
+
+class RequestMetricsMiddleware:
+    """Pure ASGI middleware counting requests and timing them per route and status"""
+
+    def __init__(self, app):
+        self.app = app
+        self.routes = None
+
+    def _route(self, scope):
+        if self.routes is None:
+            self.routes = {route.path for route in scope["app"].routes} if "app" in scope else set()
+        # Unknown paths share one label to keep cardinality bounded
+        return scope["path"] if scope["path"] in self.routes else "other"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        token = request_started.set(start)
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            request_started.reset(token)
+            path = self._route(scope)
+            request_counts.inc((path, status[0]))
+            histogram = request_durations.get(path)
+            if histogram is None:
+                with _durations_lock:
+                    histogram = request_durations.setdefault(path, Histogram(LATENCY_BUCKETS))
+            histogram.observe(time.perf_counter() - start)
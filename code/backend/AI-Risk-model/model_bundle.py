@@ -0,0 +1,171 @@
+import itertools
+import json
+import os
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from feature_pipeline import CompiledFeaturePipeline
+from fused_model import fuse_boosters, max_abs_difference
+from risk_grid import RiskGrid, artifact_fingerprint
+from metrics import stage_timers
+
+output_labels = ["Delivery Delay", "Accident Occurred", "Damaged Product", "Breakdown Occurred"]
+categorical_columns = ["Weather Condition", "Traffic Level", "Vehicle Type", "Goods Type"]
+numerical_columns = ["Distance (km)", "Driver Experience (years)", "Loading Weight (kg)", "Year of Vehicle"]
+categorical_fields = ["Weather_Condition", "Traffic_Level", "Vehicle_Type", "Goods_Type"]
+numerical_fields = ["Distance_km", "Driver_Experience_years", "Loading_Weight_kg", "Year_of_Vehicle"]
+
+# Known-good shipment scored before a bundle is put into service (same as app.py)
+CANARY = {
+    "Weather_Condition": "Rainy",
+    "Distance_km": 15.0,
+    "Traffic_Level": "High",
+    "Vehicle_Type": "Large Truck",
+    "Driver_Experience_years": 5,
+    "Goods_Type": "Perishable",
+    "Loading_Weight_kg": 2000,
+    "Year_of_Vehicle": 2015
+}
+
+_generations = itertools.count(1)
+
+
+def artifact_paths_in(model_dir):
+    return (
+        [os.path.join(model_dir, "encoder.pkl"), os.path.join(model_dir, "scaler.pkl")] +
+        [os.path.join(model_dir, f"xgb_{label}.h5") for label in output_labels]
+    )
+
+def load_thresholds(path):
+    """Decision thresholds per label; labels missing from the file keep the historical 0.5"""
+    thresholds = {label: 0.5 for label in output_labels}
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            configured = json.load(f)
+        unknown = set(configured) - set(output_labels)
+        if unknown:
+            raise ValueError(f"Unknown labels in {path}: {sorted(unknown)}")
+        for label, value in configured.items():
+            if not 0.0 < float(value) < 1.0:
+                raise ValueError(f"Threshold for {label} must be between 0 and 1, got {value}")
+            thresholds[label] = float(value)
+    return thresholds
+
+
+class ModelBundle:
+    """
+    Everything needed to score a request, loaded together: encoder, scaler, the four
+    boosters and what is derived from them (compiled feature pipeline, fused booster,
+    materialized grid) plus the thresholds. A request reads the active bundle once, so
+    swapping the bundle reference never exposes a mixed set of artifacts.
+    """
+
+    def __init__(self, model_dir, thresholds_path, inference_mode="per_label",
+                 feature_pipeline="compiled", grid_path=None):
+        self.model_dir = model_dir
+        self.generation = next(_generations)
+        self.artifact_paths = artifact_paths_in(model_dir)
+        self.fingerprint = artifact_fingerprint(self.artifact_paths)
+        self.pipeline_mode = feature_pipeline
+
+        # Load encoder and scaler
+        self.encoder = joblib.load(self.artifact_paths[0])
+        self.scaler = joblib.load(self.artifact_paths[1])
+
+        # Load all models
+        self.models = {}
+        for label, model_path in zip(output_labels, self.artifact_paths[2:]):
+            model = xgb.Booster()
+            model.load_model(model_path)
+            self.models[label] = model
+
+        self.feature_pipeline = CompiledFeaturePipeline(
+            self.encoder, self.scaler, categorical_fields, numerical_fields
+        )
+
+        self.fused_model = None
+        if inference_mode == "fused":
+            self.fused_model = fuse_boosters(list(self.models.values()))
+            # Refuse to serve a fused model that drifts from the per-label boosters
+            drift = max_abs_difference(self.fused_model, list(self.models.values()))
+            if drift > 1e-5:
+                raise RuntimeError(f"Fused model differs from per-label models by {drift}")
+
+        self.risk_grid = None
+        if grid_path:
+            self.risk_grid = RiskGrid.load(grid_path)
+            if self.risk_grid.labels != output_labels or self.risk_grid.fingerprint != self.fingerprint:
+                raise RuntimeError(f"{grid_path} was built from other model artifacts, rebuild it with risk_grid.py build")
+
+        self.thresholds = load_thresholds(thresholds_path)
+
+    def pandas_preprocess(self, records):
+        """Encode categorical data and scale numerical data with the fitted sklearn objects"""
+        with stage_timers.time("dataframe"):
+            input_data = pd.DataFrame({
+                "Weather Condition": [r.Weather_Condition for r in records],
+                "Distance (km)": [r.Distance_km for r in records],
+                "Traffic Level": [r.Traffic_Level for r in records],
+                "Vehicle Type": [r.Vehicle_Type for r in records],
+                "Driver Experience (years)": [r.Driver_Experience_years for r in records],
+                "Goods Type": [r.Goods_Type for r in records],
+                "Loading Weight (kg)": [r.Loading_Weight_kg for r in records],
+                "Year of Vehicle": [r.Year_of_Vehicle for r in records]
+            })
+        with stage_timers.time("encoder_transform"):
+            X_categorical = self.encoder.transform(input_data[categorical_columns])
+        with stage_timers.time("scaler_transform"):
+            X_numerical = self.scaler.transform(input_data[numerical_columns])
+        return np.hstack((X_categorical, X_numerical))
+
+    def preprocess(self, records):
+        """Build the model input matrix for all records at once"""
+        if self.pipeline_mode == "pandas":
+            return self.pandas_preprocess(records)
+        with stage_timers.time("feature_pipeline"):
+            if len(records) == 1:
+                return self.feature_pipeline.transform_one(records[0])
+            return self.feature_pipeline.transform_many(records)
+
+    def predict_proba(self, X):
+        """Run every booster once over the whole matrix, returns {label: probabilities}"""
+        if self.fused_model is not None:
+            # One traversal for all labels, no DMatrix needed
+            with stage_timers.time("predict_fused"):
+                fused = self.fused_model.inplace_predict(X)
+            return {label: fused[:, i] for i, label in enumerate(self.models)}
+
+        # Convert to DMatrix format for XGBoost
+        with stage_timers.time("dmatrix"):
+            dmatrix = xgb.DMatrix(X)
+        probabilities = {}
+        for label, model in self.models.items():
+            with stage_timers.time("predict", label):
+                probabilities[label] = model.predict(dmatrix)
+        return probabilities
+
+    def probability_columns(self, records):
+        """Per-label probability lists (in output_labels order) from the grid or the boosters"""
+        if self.risk_grid is None:
+            return [pred.tolist() for pred in self.predict_proba(self.preprocess(records)).values()]
+
+        # O(1) grid lookups, live inference for off-grid records and near-threshold hits
+        with stage_timers.time("grid_lookup"):
+            probabilities, misses = self.risk_grid.lookup_many(
+                records, [self.thresholds[label] for label in output_labels]
+            )
+        if misses:
+            live = self.predict_proba(self.preprocess([records[i] for i in misses]))
+            probabilities[misses] = np.column_stack(list(live.values()))
+        return [probabilities[:, j].tolist() for j in range(len(output_labels))]
+
+    def validate(self, canary):
+        """Score the canary record and check the output is a sane probability per label"""
+        columns = self.probability_columns([canary])
+        if len(columns) != len(output_labels):
+            raise RuntimeError(f"Expected {len(output_labels)} outputs, got {len(columns)}")
+        for label, column in zip(output_labels, columns):
+            if len(column) != 1 or not 0.0 <= column[0] <= 1.0:
+                raise RuntimeError(f"Canary prediction for {label} is invalid: {column}")
+        return dict(zip(output_labels, (column[0] for column in columns)))
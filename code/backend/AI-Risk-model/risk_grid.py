@@ -0,0 +1,223 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import time
+import numpy as np
+
+# Default quantization of the numeric InputData fields: (low, high, points[, tolerance]).
+# A request is answered from the grid only when every numeric value is within
+# tolerance (field units, default 0: exactly on a grid point) of its nearest grid
+# point; anything else is answered by live inference. Snapping further than that
+# changes labels: snapping every in-range value to the nearest point of a 12-point
+# grid flipped about 1 label in 7. Steps are round so quantized inputs land on points.
+DEFAULT_GRID = {
+    "Distance_km": [0.0, 1500.0, 11],
+    "Driver_Experience_years": [0, 30, 7],
+    "Loading_Weight_kg": [0.0, 40000.0, 11],
+    "Year_of_Vehicle": [1995, 2025, 7]
+}
+
+
+# Largest rounding error of a float16 probability (half an ulp just below 1.0), with slack
+FLOAT16_MARGIN = 5e-4
+
+
+def artifact_fingerprint(paths):
+    """sha256 over the model artifacts a grid was built from"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class RiskGrid:
+    """
+    Pre-scored probabilities for every combination of categorical values and
+    quantized numeric values, stored as one float16 array of shape
+    (*category counts, *numeric points, n_labels) so a request is one index lookup.
+    """
+
+    def __init__(self, table, labels, categorical_fields, categories,
+                 numerical_fields, points, fingerprint="", tolerances=None):
+        self.table = table
+        self.labels = list(labels)
+        self.categorical_fields = list(categorical_fields)
+        self.categories = [list(c) for c in categories]
+        self.numerical_fields = list(numerical_fields)
+        self.points = [np.asarray(p, dtype=np.float64) for p in points]
+        self.fingerprint = fingerprint
+        self.tolerances = [float(t) for t in tolerances] if tolerances is not None else [0.0] * len(self.points)
+        self.lookups = [{c: i for i, c in enumerate(values)} for values in self.categories]
+
+    def save(self, path):
+        np.savez(
+            path,
+            table=self.table,
+            meta=json.dumps({
+                "labels": self.labels,
+                "categorical_fields": self.categorical_fields,
+                "categories": self.categories,
+                "numerical_fields": self.numerical_fields,
+                "points": [p.tolist() for p in self.points],
+                "fingerprint": self.fingerprint,
+                "tolerances": self.tolerances
+            })
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            table = data["table"]
+        return cls(table, meta["labels"], meta["categorical_fields"], meta["categories"],
+                   meta["numerical_fields"], meta["points"], meta["fingerprint"], meta.get("tolerances"))
+
+    def _numeric_index(self, values, points, tolerance):
+        # Nearest grid point; -1 when the value is off the grid or further than tolerance from it
+        if len(points) == 1:
+            index = np.zeros(len(values), dtype=np.int64)
+            return np.where(np.abs(values - points[0]) <= tolerance, index, -1)
+        step = points[1] - points[0]
+        index = np.rint((values - points[0]) / step).astype(np.int64)
+        nearest = points[np.clip(index, 0, len(points) - 1)]
+        # Slack for the rounding of linspace points, so exact hits stay hits
+        close = np.abs(values - nearest) <= tolerance + 1e-9 * step
+        return np.where((index >= 0) & (index < len(points)) & close, index, -1)
+
+    def lookup_many(self, records, thresholds=None):
+        """
+        Returns (probabilities, misses): an (n, n_labels) float64 matrix filled for grid
+        hits and the list of record positions that must be scored live. With thresholds
+        (one per label), hits whose stored probability is within float16 rounding of a
+        threshold are misses too, so the grid never flips a label.
+        """
+        n = len(records)
+        indices = []
+        hit = np.ones(n, dtype=bool)
+
+        for field, lookup in zip(self.categorical_fields, self.lookups):
+            index = np.array([lookup.get(getattr(r, field), -1) for r in records], dtype=np.int64)
+            hit &= index >= 0
+            indices.append(index)
+
+        for field, points, tolerance in zip(self.numerical_fields, self.points, self.tolerances):
+            values = np.array([getattr(r, field) for r in records], dtype=np.float64)
+            index = self._numeric_index(values, points, tolerance)
+            hit &= index >= 0
+            indices.append(index)
+
+        probabilities = np.zeros((n, len(self.labels)), dtype=np.float64)
+        if hit.any():
+            probabilities[hit] = self.table[tuple(index[hit] for index in indices)]
+            if thresholds is not None:
+                hit &= ~(np.abs(probabilities - np.asarray(thresholds)) <= FLOAT16_MARGIN).any(axis=1)
+        return probabilities, np.flatnonzero(~hit).tolist()
+
+
+def build_grid(pipeline, score_matrix, labels, categories, spec, fingerprint=""):
+    """
+    Score every grid combination. score_matrix(X) must return an (n, n_labels)
+    probability matrix for a float32 feature matrix built like pipeline's output.
+    Work is chunked per categorical combination to bound memory.
+    """
+    numerical_fields = pipeline.numerical_fields
+    points = [np.linspace(*map(float, spec[field][:2]), int(spec[field][2])) for field in numerical_fields]
+    tolerances = [float(spec[field][3]) if len(spec[field]) > 3 else 0.0 for field in numerical_fields]
+    numeric_shape = [len(p) for p in points]
+    category_shape = [len(c) for c in categories]
+
+    # Scaled numeric block shared by every categorical combination
+    mesh = np.meshgrid(*points, indexing="ij")
+    numeric = np.column_stack([m.ravel() for m in mesh])
+    scaled = ((numeric - np.asarray(pipeline.mean)) / np.asarray(pipeline.scale)).astype(np.float32)
+
+    table = np.zeros(category_shape + numeric_shape + [len(labels)], dtype=np.float16)
+    X = np.zeros((len(scaled), pipeline.n_features), dtype=np.float32)
+    X[:, pipeline.n_categorical:] = scaled
+
+    for combo in itertools.product(*[range(n) for n in category_shape]):
+        X[:, :pipeline.n_categorical] = 0.0
+        offset = 0
+        for index, values in zip(combo, categories):
+            X[:, offset + index] = 1.0
+            offset += len(values)
+        table[combo] = score_matrix(X).reshape(numeric_shape + [len(labels)])
+
+    return RiskGrid(table, labels, pipeline.categorical_fields, categories,
+                    numerical_fields, points, fingerprint, tolerances)
+
+
+def load_spec(path):
+    spec = {field: list(bounds) for field, bounds in DEFAULT_GRID.items()}
+    if path:
+        with open(path, 'r') as f:
+            spec.update(json.load(f))
+    return spec
+
+
+if __name__ == "__main__":
+    # python risk_grid.py build [--config grid.json] [--output risk_grid.npz]
+    # python risk_grid.py report [--rows 20000] [--output risk_grid.npz]
+    parser = argparse.ArgumentParser(description="Build or evaluate the materialized risk grid")
+    parser.add_argument("command", choices=["build", "report"])
+    parser.add_argument("--config", help="JSON file overriding DEFAULT_GRID entries")
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "risk_grid.npz"))
+    parser.add_argument("--rows", type=int, default=20000, help="Random rows used by report")
+    args = parser.parse_args()
+
+    # Always score live, whatever grid the environment points at
+    os.environ["RISK_GRID"] = "0"
+    import main
+    from synthetic import random_shipments
+
+    if args.command == "build":
+        spec = load_spec(args.config)
+        start = time.perf_counter()
+        bundle = main.bundle
+        grid = build_grid(
+            bundle.feature_pipeline,
+            lambda X: np.column_stack(list(bundle.predict_proba(X).values())),
+            main.output_labels,
+            [list(c) for c in bundle.encoder.categories_],
+            spec,
+            bundle.fingerprint
+        )
+        grid.save(args.output)
+        print(f"Built {grid.table.shape} grid ({grid.table.nbytes / 1e6:.1f} MB) "
+              f"in {time.perf_counter() - start:.1f}s -> {args.output}")
+
+    else:
+        bundle = main.bundle
+        grid = RiskGrid.load(args.output)
+        if grid.fingerprint != bundle.fingerprint:
+            print("WARNING: grid was built from different model artifacts")
+        shipments = random_shipments(args.rows, seed=7)
+        # The same rows with their numeric values moved onto the nearest grid point,
+        # as sent by clients that quantize their inputs
+        quantized = [dict(s) for s in shipments]
+        for field, points in zip(grid.numerical_fields, grid.points):
+            for s in quantized:
+                s[field] = float(points[np.argmin(np.abs(points - s[field]))])
+
+        records, hits = [], []
+        thresholds = [bundle.thresholds[label] for label in grid.labels]
+        for name, rows in [("random", shipments), ("quantized", quantized)]:
+            batch = [main.InputData(**s) for s in rows]
+            _, misses = grid.lookup_many(batch, thresholds)
+            print(f"Grid hit rate: {1 - len(misses) / len(batch):.2%} of {len(batch)} {name} in-range rows")
+            hits.extend(len(records) + np.setdiff1d(np.arange(len(batch)), misses))
+            records.extend(batch)
+
+        # Agreement is measured on the rows the grid answers, the others are scored live
+        grid_probabilities, _ = grid.lookup_many(records)
+        live = np.column_stack(list(bundle.predict_proba(bundle.preprocess(records)).values()))
+        hits = np.asarray(hits, dtype=np.int64)
+        for j, label in enumerate(grid.labels):
+            threshold = bundle.thresholds[label]
+            difference = np.abs(grid_probabilities[hits, j] - live[hits, j])
+            agreement = np.mean((grid_probabilities[hits, j] > threshold) == (live[hits, j] > threshold))
+            print(f"{label:20s} label agreement={agreement:.2%}  "
+                  f"mean |dp|={difference.mean():.4f}  max |dp|={difference.max():.4f}")
@@ -0,0 +1,95 @@
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import uvicorn
+
+# Pre-fork launcher for the risk service.
+#
+# `uvicorn main:app --workers N` spawns fresh interpreters, so every worker unpickles
+# encoder.pkl/scaler.pkl and loads the four boosters into private memory. Here the
+# artifacts are loaded once in the parent, which then forks the workers: they share
+# the model pages copy-on-write and resident memory stays flat as N grows.
+#
+# Usage: python serve.py --workers 4 [--host 127.0.0.1] [--port 8000]
+
+
+def run_worker(app, sock, args):
+    config = uvicorn.Config(app, host=args.host, port=args.port, log_level=args.log_level)
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+
+
+def spawn(app, sock, args):
+    pid = os.fork()
+    if pid == 0:
+        # Restore default signal handling, uvicorn installs its own
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        try:
+            run_worker(app, sock, args)
+        finally:
+            os._exit(0)
+    return pid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the risk model with pre-forked workers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    # Load every artifact once, before forking
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from main import app
+
+    # Move everything allocated so far out of the GC's reach, so collections in the
+    # workers do not write to (and therefore copy) the shared pages
+    gc.collect()
+    gc.freeze()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    workers = {spawn(app, sock, args) for _ in range(args.workers)}
+    print(f"Parent {os.getpid()} serving on http://{args.host}:{args.port} with workers {sorted(workers)}")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    # Reap workers and replace any that die unexpectedly
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not stopping:
+            print(f"Worker {pid} exited with status {status}, restarting")
+            workers.add(spawn(app, sock, args))
+
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
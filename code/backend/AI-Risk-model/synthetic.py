@@ -0,0 +1,33 @@
+import random
+
+# Category values seen by encoder.pkl at training time
+CATEGORIES = {
+    "Weather_Condition": ["Clear", "Cloudy", "Foggy", "Rainy", "Snowy", "Stormy"],
+    "Traffic_Level": ["High", "Low", "Medium", "Severe"],
+    "Vehicle_Type": ["Large Truck", "Medium Truck", "Refrigerated Truck", "Small Van"],
+    "Goods_Type": ["Fragile", "General Cargo", "Hazardous Materials", "Perishable"]
+}
+
+def random_shipment(rng=random, unknown_rate=0.0):
+    """
+    Generate one /predict/ payload with the InputData fields.
+    With unknown_rate > 0 some categorical values are replaced by an unseen category.
+    """
+    shipment = {}
+    for field, values in CATEGORIES.items():
+        if unknown_rate and rng.random() < unknown_rate:
+            shipment[field] = "Unknown"
+        else:
+            shipment[field] = rng.choice(values)
+    shipment.update({
+        "Distance_km": round(rng.uniform(10, 1500), 1),
+        "Driver_Experience_years": rng.randint(0, 30),
+        "Loading_Weight_kg": round(rng.uniform(100, 40000), 1),
+        "Year_of_Vehicle": rng.randint(1995, 2024)
+    })
+    return shipment
+
+def random_shipments(n, seed=0, unknown_rate=0.0):
+    """Generate n reproducible /predict/ payloads"""
+    rng = random.Random(seed)
+    return [random_shipment(rng, unknown_rate) for _ in range(n)]
@@ -0,0 +1,90 @@
+import argparse
+import os
+import pickle
+import numpy as np
+from demand_model import DemandModel, calendar_features
+
+# Offline training of the lightweight demand model served by /predict_demand/ and
+# /predict_commands/.
+#
+# The daily history (log1p demand and temperature) is read from the Prophet model of
+# the demand service, which stores the data it was fitted on. Prophet is only needed
+# here, not by the risk service at serving time.
+#
+#   python train_demand_model.py [--prophet ../Ai-Demand-prediction/prophet_model_log.pkl]
+#                                [--holdout-days 365] [--yearly-order 10] [--output demand_model.json]
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PROPHET = os.path.join(current_dir, "..", "Ai-Demand-prediction", "prophet_model_log.pkl")
+
+
+def load_history(prophet_path):
+    """(days, raw temperatures, log1p demand) from the Prophet model's training frame"""
+    with open(prophet_path, 'rb') as f:
+        prophet = pickle.load(f)
+    history = prophet.history
+    regressor = prophet.extra_regressors["temperature"]
+    # Prophet keeps the regressor standardized
+    temperatures = history["temperature"].to_numpy() * regressor["std"] + regressor["mu"]
+    days = history["ds"].to_numpy().astype("datetime64[D]")
+    return prophet, days, temperatures, history["y"].to_numpy()
+
+
+def fit(days, temperatures, y, origin, yearly_order, ridge):
+    """Ridge least squares; the intercept is not penalized"""
+    X = calendar_features(days, temperatures, origin, yearly_order)
+    penalty = ridge * np.eye(X.shape[1])
+    penalty[0, 0] = 0.0
+    return np.linalg.solve(X.T @ X + penalty, X.T @ y)
+
+
+def mean_absolute_error(predicted, actual):
+    return float(np.mean(np.abs(predicted - actual)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the lightweight demand model")
+    parser.add_argument("--prophet", default=DEFAULT_PROPHET, help="Prophet pickle holding the training history")
+    parser.add_argument("--holdout-days", type=int, default=365, help="Most recent days kept out to evaluate")
+    parser.add_argument("--yearly-order", type=int, default=10)
+    parser.add_argument("--ridge", type=float, default=1.0)
+    parser.add_argument("--output", default=os.path.join(current_dir, "demand_model.json"))
+    args = parser.parse_args()
+
+    prophet, days, temperatures, y = load_history(args.prophet)
+    origin = str(days[0])
+    actual = np.expm1(y)
+    split = len(days) - args.holdout_days
+
+    # Holdout evaluation, then refit on everything for serving
+    coefficients = fit(days[:split], temperatures[:split], y[:split], origin, args.yearly_order, args.ridge)
+    holdout = DemandModel(coefficients, origin, args.yearly_order, temperatures.mean())
+    holdout_mae = mean_absolute_error(holdout.predict(days[split:], temperatures[split:]), actual[split:])
+
+    model = DemandModel(fit(days, temperatures, y, origin, args.yearly_order, args.ridge),
+                        origin, args.yearly_order, temperatures.mean())
+    train_mae = mean_absolute_error(model.predict(days, temperatures), actual)
+
+    # Prophet was fitted on the whole history, so its errors are in-sample everywhere
+    prophet.uncertainty_samples = 0
+    import pandas as pd
+    frame = pd.DataFrame({"ds": days.astype("datetime64[ns]"), "temperature": temperatures})
+    prophet_prediction = np.expm1(prophet.predict(frame)["yhat"].to_numpy())
+    prophet_mae = mean_absolute_error(prophet_prediction, actual)
+    prophet_holdout_mae = mean_absolute_error(prophet_prediction[split:], actual[split:])
+
+    model.metadata = {
+        "target": "log1p(daily demand)",
+        "training_days": [str(days[0]), str(days[-1])],
+        "holdout_days": args.holdout_days,
+        "ridge": args.ridge,
+        "mae": {"train": train_mae, "holdout": holdout_mae,
+                "prophet_in_sample": prophet_mae, "prophet_holdout_in_sample": prophet_holdout_mae}
+    }
+    model.save(args.output)
+
+    print(f"Trained on {len(days)} days ({days[0]} .. {days[-1]}), {len(model.coefficients)} coefficients")
+    print(f"MAE holdout (last {args.holdout_days} days, refit excluded): {holdout_mae:.2f}  "
+          f"[Prophet on the same days, in-sample: {prophet_holdout_mae:.2f}]")
+    print(f"MAE all days: {train_mae:.2f}  [Prophet: {prophet_mae:.2f}]")
+    print(f"Saved to {args.output}")
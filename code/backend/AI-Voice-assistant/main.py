@@ -1,4 +1,6 @@
 import asyncio
+import os
+import sys
 from src.agents.agent import Agent
 from src.tools.calendar.calendar_tool import CalendarTool
 from src.tools.contacts import AddContactTool, FetchContactTool
@@ -13,6 +15,9 @@ import json
 
 load_dotenv()
 
+# EventMonitor reads delay events through the delay detector's event store
+sys.path.append(os.getenv("DELAY_DETECTOR_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), '../DelayDetector')))
+
 model = "groq/llama3-70b-8192"
 
 tools_list = [
@@ -1,8 +1,8 @@
 import datetime
-import sys
 import os
 import json
-from typing import ClassVar, Dict, Any
+import threading
+from typing import ClassVar, Dict, Any, Optional
 from pydantic import Field
 from ..base_tool import BaseTool
 from .. import CalendarTool  # Import from tools package
@@ -14,20 +14,35 @@ class EventMonitor(BaseTool):
     action: str = Field(description="Action to perform: check_status, analyze_impact, propose_solution")
     event_id: str = Field(default=None, description="ID of the event to monitor")
     
-    EVENTS_JSON_PATH: ClassVar[str] = os.path.join(
+    EVENTS_JSON_PATH: ClassVar[str] = os.getenv("DELAY_EVENTS_PATH", os.path.join(
         os.path.dirname(os.path.abspath(__file__)), 
         '../../../../DelayDetector/delay_events.json'
-    )
+    ))
+    # Shared by every tool call, created on first use so importing the tool opens nothing
+    _event_store: ClassVar[Optional[Any]] = None
+    _event_store_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def event_store(cls):
+        """
+        The delay detector's event store (DelayDetector/event_store.py): the JSON snapshot
+        plus the events logged since its last compaction, read under the store's lock and
+        followed incrementally between calls. DelayDetector is put on the import path by
+        the entry point (main.py).
+        """
+        with cls._event_store_lock:
+            if cls._event_store is None:
+                from event_store import EventStore
+                cls._event_store = EventStore(cls.EVENTS_JSON_PATH)
+            return cls._event_store
 
     def get_current_events(self) -> Dict[str, Any]:
-        """Fetch current events from JSON file"""
+        """Fetch current events from the delay event store"""
         try:
-            if os.path.exists(self.EVENTS_JSON_PATH):
-                with open(self.EVENTS_JSON_PATH, 'r') as f:
-                    return json.load(f)
+            return self.event_store().all()
         except Exception as e:
             print(f"Error reading events: {e}")
-        return {}
+            return {}
 
     def check_status(self):
         """Check current status of operations"""
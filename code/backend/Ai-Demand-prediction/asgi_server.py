@@ -0,0 +1,159 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+import forecast_worker
+
+# ASGI serving mode for the demand forecaster (needs fastapi and uvicorn, as the risk service):
+#
+#   uvicorn asgi_server:app --host 0.0.0.0 --port 5000
+#
+# Same /forecast and /predict_demand contracts as server.py, but model.predict runs in
+# a bounded process pool instead of blocking a request thread, so CPU-heavy forecasts
+# use every core. Requests beyond DEMAND_POOL_WORKERS running + DEMAND_POOL_QUEUE waiting
+# are rejected with 429 and a Retry-After header instead of piling up. GET /health
+# answers 503 "starting" until a worker has loaded the model.
+
+POOL_WORKERS = int(os.getenv("DEMAND_POOL_WORKERS", str(os.cpu_count() or 1)))
+POOL_QUEUE = int(os.getenv("DEMAND_POOL_QUEUE", str(2 * POOL_WORKERS)))
+RETRY_AFTER_SECONDS = os.getenv("DEMAND_RETRY_AFTER", "1")
+
+
+def pool_context():
+    # Workers must not be forked from the event loop process (its threads and locks
+    # would be copied mid-use); forkserver preloads the heavy imports once, Windows
+    # only has spawn. Each worker loads the model in the pool initializer.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["forecast_worker", "pandas", "prophet"])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+class ForecastPool:
+    """Process pool with a hard cap on accepted work; submit() returns None when full"""
+
+    def __init__(self, workers, queue_size):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.restarts = 0
+        self.executor = self._start()
+
+    def _start(self):
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=pool_context(),
+                                   initializer=forecast_worker.warm_up)
+
+    async def submit(self, handler_name, data):
+        # Only the event loop thread touches the counters, no lock needed
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            return None
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self.executor, forecast_worker.handle, handler_name, data)
+            self.completed += 1
+            return result
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); replace the pool for later requests
+            self.restarts += 1
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = self._start()
+            return {"error": "Forecast error: worker process died, please retry."}, 503
+        finally:
+            self.in_flight -= 1
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "restarts": self.restarts
+        }
+
+
+app = FastAPI()
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+pool = None
+health = {"status": "starting"}
+
+
+async def probe_health():
+    """Ask a worker for the model status until it is ready; the first call starts the pool"""
+    global health
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            health, _ = await loop.run_in_executor(pool.executor, forecast_worker.handle, "health_response")
+        except BrokenProcessPool:
+            health = {"status": "failed", "error": "Forecast worker process died while starting."}
+        if health["status"] == "ready":
+            return
+        await asyncio.sleep(1.0)
+
+
+@app.on_event("startup")
+async def start_pool():
+    global pool
+    pool = ForecastPool(POOL_WORKERS, POOL_QUEUE)
+    asyncio.get_running_loop().create_task(probe_health())
+
+
+@app.on_event("shutdown")
+async def stop_pool():
+    pool.shutdown()
+
+
+async def dispatch(request, handler_name):
+    try:
+        data = await request.json()
+    except ValueError:
+        return JSONResponse({"error": "Request body must be JSON."}, status_code=400)
+    result = await pool.submit(handler_name, data)
+    if result is None:
+        return JSONResponse({"error": "Forecast workers are busy, retry later."}, status_code=429,
+                            headers={"Retry-After": RETRY_AFTER_SECONDS})
+    body, status = result
+    return JSONResponse(body, status_code=status)
+
+
+@app.get("/", response_class=PlainTextResponse)
+async def home():
+    return "Welcome to the Prophet Forecast API! Use the `/forecast` endpoint to make predictions."
+
+
+@app.post("/forecast")
+async def forecast(request: Request):
+    """Same payloads and responses as server.py /forecast"""
+    return await dispatch(request, "forecast_response")
+
+
+@app.post("/predict_demand")
+async def predict_demand(request: Request):
+    """Same payloads and responses as server.py /predict_demand"""
+    return await dispatch(request, "predict_demand_response")
+
+
+@app.get("/health")
+async def health_check():
+    """"starting" until a worker has loaded the model, then "ready" (HTTP 200)"""
+    status = 200 if health["status"] == "ready" else 503
+    return JSONResponse({**health, "pool": pool.stats()}, status_code=status)
+
+
+@app.get("/pool/stats")
+async def pool_stats():
+    """Running/queued work and 429 rejections of the forecast process pool"""
+    return pool.stats()
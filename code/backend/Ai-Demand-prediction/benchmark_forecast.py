@@ -0,0 +1,111 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+
+# Benchmark for /forecast at increasing horizons.
+#
+#   python benchmark_forecast.py                          # horizons 10 365 3650, 1 and 20 series
+#   python benchmark_forecast.py --horizons 30 730 --series 1 50 --repeat 3
+#
+# Every request goes through the Flask test client, so JSON parsing and serialization
+# are included. For each horizon the per-row steps the endpoint used to run (one
+# pd.to_datetime call per date, iterrows to build the response) are timed next to the
+# vectorized versions on the same model output, and every request is repeated with
+# "intervals": false (point forecast, no uncertainty sampling).
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def payload(days, n_series, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2024-01-01", periods=days).strftime('%d.%m.%Y').tolist()
+    series = [
+        {"id": f"series-{k}", "dates": dates, "temperatures": np.round(rng.uniform(-5, 40, days), 1).tolist()}
+        for k in range(n_series)
+    ]
+    return series[0] if n_series == 1 else {"series": series}
+
+
+def best_of(repeat, fn):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000.0
+
+
+def per_row_steps(server, dates, temperatures, repeat):
+    """Date parsing and response building, per row (old) vs vectorized (current)"""
+    df_input = pd.DataFrame({"ds": server.parse_dates(dates), "temperature": temperatures})
+    forecast_df = server.model.predict(df_input)
+    for column in ('yhat', 'yhat_lower', 'yhat_upper'):
+        forecast_df[column + '_original'] = np.expm1(forecast_df[column])
+
+    def build_rows():
+        return [
+            {
+                "date": row['ds'].strftime('%d.%m.%Y'),
+                "forecast": row['yhat_original'],
+                "forecast_lower": row['yhat_lower_original'],
+                "forecast_upper": row['yhat_upper_original']
+            }
+            for _, row in forecast_df.iterrows()
+        ]
+
+    def build_columns():
+        return {
+            "dates": forecast_df['ds'].dt.strftime(server.DATE_FORMAT).tolist(),
+            **{name: forecast_df[column].tolist() for name, column in (
+                ('forecast', 'yhat_original'), ('forecast_lower', 'yhat_lower_original'),
+                ('forecast_upper', 'yhat_upper_original'))}
+        }
+
+    return {
+        "parse_per_row_ms": best_of(repeat, lambda: [pd.to_datetime(d, format='%d.%m.%Y') for d in dates]),
+        "parse_vectorized_ms": best_of(repeat, lambda: server.parse_dates(dates)),
+        "build_iterrows_ms": best_of(repeat, build_rows),
+        "build_columns_ms": best_of(repeat, build_columns)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the /forecast endpoint")
+    parser.add_argument("--horizons", type=int, nargs="+", default=[10, 365, 3650])
+    parser.add_argument("--series", type=int, nargs="+", default=[1, 20], help="Series per request")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=os.path.join(current_dir, "benchmark_forecast.json"))
+    args = parser.parse_args()
+
+    # Repeated requests must reach the model, not the forecast cache
+    os.environ["DEMAND_CACHE_SIZE"] = "0"
+    import server
+    if not server.wait_for_model():
+        raise RuntimeError(server.model_error)
+    client = server.app.test_client()
+    results = []
+
+    for days in args.horizons:
+        body = payload(days, 1)
+        steps = per_row_steps(server, body["dates"], body["temperatures"], args.repeat)
+        for n_series in args.series:
+            body = payload(days, n_series)
+            response = client.post('/forecast', json=body)
+            if response.status_code != 200:
+                raise RuntimeError(response.get_data(as_text=True))
+            request_ms = best_of(args.repeat, lambda: client.post('/forecast', json=body))
+            point_body = dict(body, intervals=False)
+            point_ms = best_of(args.repeat, lambda: client.post('/forecast', json=point_body))
+            results.append({"days": days, "series": n_series, "request_ms": request_ms, "point_request_ms": point_ms,
+                            "rows_per_second": days * n_series / request_ms * 1000.0, **steps})
+            print(f"days={days:<5d} series={n_series:<3d} request={request_ms:9.1f}ms  point={point_ms:8.1f}ms  "
+                  f"rows/s={days * n_series / request_ms * 1000.0:9.0f}  "
+                  f"parse {steps['parse_per_row_ms']:.1f}->{steps['parse_vectorized_ms']:.1f}ms  "
+                  f"build {steps['build_iterrows_ms']:.1f}->{steps['build_columns_ms']:.1f}ms")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f"Results saved to {args.output}")
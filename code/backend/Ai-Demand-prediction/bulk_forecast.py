@@ -0,0 +1,141 @@
+import argparse
+import multiprocessing
+import os
+import pickle
+import time
+import numpy as np
+import pandas as pd
+from model_registry import ModelRegistry
+
+# Nightly bulk forecast over the per-series models of the registry (DEMAND_MODELS_DIR).
+#
+#   python bulk_forecast.py --start 01.01.2025 --days 365 [--workers 8] [--series wh-1 wh-2]
+#                           [--temperatures temperatures.csv] [--intervals] [--output forecasts.parquet]
+#
+# Every series is one task for a process pool, so the run scales with the number of
+# cores. Temperatures come from a CSV with columns series,date,temperature (dd.mm.yyyy);
+# days without a value use the series model's mean training temperature.
+#
+# Output is columnar: series, date, forecast (+ forecast_lower/forecast_upper with
+# --intervals). Parquet (one row group per series, written as results arrive) when
+# pyarrow is installed, otherwise a .npz with the same columns.
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def forecast_series(task):
+    """Runs in a worker: load one series model and forecast the whole horizon"""
+    series_id, path, start, days, temperatures, intervals = task
+    with open(path, 'rb') as f:
+        model = pickle.load(f)
+    if not intervals:
+        model.uncertainty_samples = 0
+
+    ds = pd.date_range(start, periods=days, freq='D')
+    regressor = model.extra_regressors.get("temperature", {})
+    filled = np.where(np.isnan(temperatures), regressor.get("mu", 0.0), temperatures)
+    forecast_df = model.predict(pd.DataFrame({"ds": ds, "temperature": filled}))
+
+    # Inverse the log1p transformation, as the API does
+    columns = {"forecast": np.expm1(forecast_df['yhat'].to_numpy())}
+    if intervals:
+        columns["forecast_lower"] = np.expm1(forecast_df['yhat_lower'].to_numpy())
+        columns["forecast_upper"] = np.expm1(forecast_df['yhat_upper'].to_numpy())
+    return series_id, ds.to_numpy().astype('datetime64[D]'), columns
+
+
+def load_temperatures(path, series_ids, start, days):
+    """{series id: temperature per horizon day, NaN where the CSV has no value}"""
+    horizon = {series_id: np.full(days, np.nan) for series_id in series_ids}
+    if not path:
+        return horizon
+    frame = pd.read_csv(path, dtype={"series": str})
+    offsets = (pd.to_datetime(frame["date"], format='%d.%m.%Y') - start).dt.days.to_numpy()
+    inside = (offsets >= 0) & (offsets < days) & frame["series"].isin(horizon).to_numpy()
+    for series_id, offset, temperature in zip(frame["series"][inside], offsets[inside], frame["temperature"][inside]):
+        horizon[series_id][offset] = temperature
+    return horizon
+
+
+class ParquetSink:
+    def __init__(self, path, intervals):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        fields = [("series", pa.string()), ("date", pa.date32()), ("forecast", pa.float64())]
+        if intervals:
+            fields += [("forecast_lower", pa.float64()), ("forecast_upper", pa.float64())]
+        self.schema = pa.schema(fields)
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, series_id, days, columns):
+        arrays = [self.pa.array([series_id] * len(days)), self.pa.array(days)]
+        arrays += [self.pa.array(columns[name]) for name in self.schema.names[2:]]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+class NpzSink:
+    def __init__(self, path, intervals):
+        self.path = path
+        self.parts = []
+
+    def write(self, series_id, days, columns):
+        self.parts.append((np.full(len(days), series_id), days, columns))
+
+    def close(self):
+        names = self.parts[0][2].keys() if self.parts else ["forecast"]
+        np.savez(
+            self.path,
+            series=np.concatenate([p[0] for p in self.parts]) if self.parts else np.array([], dtype=str),
+            date=np.concatenate([p[1] for p in self.parts]) if self.parts else np.array([], dtype='datetime64[D]'),
+            **{name: np.concatenate([p[2][name] for p in self.parts]) if self.parts else np.array([])
+               for name in names}
+        )
+
+
+def open_sink(path, intervals):
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        path = os.path.splitext(path)[0] + ".npz"
+        print(f"pyarrow is not installed, writing {path} instead")
+        return path, NpzSink(path, intervals)
+    return path, ParquetSink(path, intervals)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Forecast every per-series model in parallel")
+    parser.add_argument("--models-dir", default=os.getenv("DEMAND_MODELS_DIR", os.path.join(current_dir, "models")))
+    parser.add_argument("--series", nargs="+", help="Series ids (default: every model in --models-dir)")
+    parser.add_argument("--start", required=True, help="First day, dd.mm.yyyy")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--temperatures", help="CSV with columns series,date,temperature")
+    parser.add_argument("--intervals", action="store_true", help="Also sample forecast_lower/forecast_upper (slower)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output", default=os.path.join(current_dir, "forecasts.parquet"))
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.models_dir)
+    series_ids = args.series or registry.series_ids()
+    if not series_ids:
+        raise SystemExit(f"No series models found in {args.models_dir}")
+    start = pd.to_datetime(args.start, format='%d.%m.%Y')
+    temperatures = load_temperatures(args.temperatures, series_ids, start, args.days)
+    tasks = [(series_id, registry.path_for(series_id), start, args.days, temperatures[series_id], args.intervals)
+             for series_id in series_ids]
+
+    output, sink = open_sink(args.output, args.intervals)
+    began = time.perf_counter()
+    rows = 0
+    with multiprocessing.Pool(args.workers) as pool:
+        for series_id, days, columns in pool.imap_unordered(forecast_series, tasks):
+            sink.write(series_id, days, columns)
+            rows += len(days)
+    sink.close()
+    elapsed = time.perf_counter() - began
+
+    print(f"{len(series_ids)} series x {args.days} days = {rows} rows in {elapsed:.1f}s "
+          f"({len(series_ids) / elapsed:.1f} series/s, {args.workers} workers) -> {output}")
@@ -0,0 +1,122 @@
+import argparse
+import hashlib
+import os
+import pickle
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+# Precomputed daily forecast table for the Prophet model.
+#
+# The model has one extra regressor (temperature) and Prophet is linear in its
+# regressors, so for a fixed day the forecast (log scale) is
+#     yhat(day, temperature) = intercept[day] + slope[day] * temperature
+# where intercept/slope carry the trend, the seasonalities and the regressor
+# coefficient. Evaluating the model once at temperature 0 and 1 for every day of the
+# horizon gives both arrays; a point forecast is then an index lookup and a multiply-add.
+#
+#   python demand_table.py build [--start 01.01.2024] [--days 1096] [--output demand_table.npz]
+#   python demand_table.py check [--rows 20000]      # parity against the live model
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODEL = os.path.join(current_dir, "prophet_model_log.pkl")
+DEFAULT_TABLE = os.path.join(current_dir, "demand_table.npz")
+
+
+def model_fingerprint(path):
+    """sha256 of the model pickle a table was built from"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+
+class DemandTable:
+    """Per-day intercept and temperature slope of the log-scale forecast, from `start` on"""
+
+    def __init__(self, start, intercept, slope, fingerprint=""):
+        self.start = np.datetime64(start, 'D')
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.slope = np.asarray(slope, dtype=np.float64)
+        self.fingerprint = fingerprint
+
+    @property
+    def days(self):
+        return len(self.intercept)
+
+    def save(self, path):
+        np.savez(path, start=str(self.start), intercept=self.intercept, slope=self.slope,
+                 fingerprint=self.fingerprint)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(str(data["start"]), data["intercept"], data["slope"], str(data["fingerprint"]))
+
+    def lookup(self, ds, temperatures):
+        """
+        Returns (yhat, hit): log-scale forecasts for a datetime Series and matching
+        temperatures, and the mask of rows inside the table (yhat is 0 elsewhere).
+        """
+        index = (ds.to_numpy().astype('datetime64[D]') - self.start).astype(np.int64)
+        hit = (index >= 0) & (index < self.days)
+        index = np.where(hit, index, 0)
+        yhat = self.intercept[index] + self.slope[index] * np.asarray(temperatures, dtype=np.float64)
+        return np.where(hit, yhat, 0.0), hit
+
+
+def build_table(point_model, start, days, fingerprint=""):
+    """Evaluate point_model (uncertainty_samples=0) at temperature 0 and 1 for every day"""
+    ds = pd.date_range(start, periods=days, freq='D')
+    at_zero = point_model.predict(pd.DataFrame({"ds": ds, "temperature": 0.0}))['yhat'].to_numpy()
+    at_one = point_model.predict(pd.DataFrame({"ds": ds, "temperature": 1.0}))['yhat'].to_numpy()
+    return DemandTable(ds[0].to_datetime64(), at_zero, at_one - at_zero, fingerprint)
+
+
+def check_parity(model, table, rows, seed=7):
+    """Random in-table dates and temperatures scored by the table and by the live model"""
+    rng = np.random.default_rng(seed)
+    ds = pd.Series(table.start + rng.integers(0, table.days, rows).astype('timedelta64[D]')).astype('datetime64[ns]')
+    temperatures = np.round(rng.uniform(-10.0, 45.0, rows), 2)
+
+    yhat, hit = table.lookup(ds, temperatures)
+    live = model.predict(pd.DataFrame({"ds": ds, "temperature": temperatures}))
+    # predict() returns rows sorted by date; sort the table output the same (stable) way
+    order = np.argsort(ds.to_numpy(), kind='stable')
+    difference = np.abs(np.expm1(yhat[order]) - np.expm1(live['yhat'].to_numpy()))
+    return bool(hit.all()), float(difference.max())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or check the precomputed demand table")
+    parser.add_argument("command", choices=["build", "check"])
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--output", default=DEFAULT_TABLE)
+    parser.add_argument("--start", default=None, help="First day, dd.mm.yyyy (default: today)")
+    parser.add_argument("--days", type=int, default=1096)
+    parser.add_argument("--rows", type=int, default=20000, help="Random rows used by check")
+    parser.add_argument("--tolerance", type=float, default=1e-6, help="Max absolute forecast difference")
+    args = parser.parse_args()
+
+    with open(args.model, 'rb') as f:
+        model = pickle.load(f)
+    model.uncertainty_samples = 0
+
+    if args.command == "build":
+        start = pd.to_datetime(args.start, format='%d.%m.%Y') if args.start else pd.Timestamp.today().normalize()
+        began = time.perf_counter()
+        table = build_table(model, start, args.days, model_fingerprint(args.model))
+        table.save(args.output)
+        print(f"Built {table.days} days from {table.start} in {time.perf_counter() - began:.1f}s -> {args.output}")
+
+    else:
+        table = DemandTable.load(args.output)
+        if table.fingerprint != model_fingerprint(args.model):
+            print(f"FAIL {args.output} was built from a different model pickle")
+            sys.exit(1)
+        all_hit, max_difference = check_parity(model, table, args.rows)
+        ok = all_hit and max_difference <= args.tolerance
+        print(f"{'OK' if ok else 'FAIL'}: max |forecast difference| = {max_difference:.3g} "
+              f"over {args.rows} rows ({table.days} days from {table.start})")
+        sys.exit(0 if ok else 1)
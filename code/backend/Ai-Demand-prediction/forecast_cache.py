@@ -0,0 +1,76 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+class ForecastCache:
+    """
+    Bounded least-recently-used cache of per-day forecasts keyed on (day, temperature).
+    With `decimals`, callers round temperatures with round_temperatures before scoring
+    and keying; None keeps them exact. Thread-safe, Flask serves requests from several threads.
+    """
+
+    def __init__(self, maxsize=10000, decimals=None):
+        self.maxsize = maxsize
+        self.decimals = decimals
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def round_temperatures(self, temperatures):
+        temperatures = np.asarray(temperatures, dtype=float)
+        return temperatures if self.decimals is None else np.round(temperatures, self.decimals)
+
+    def keys(self, generation, ds, temperatures):
+        """
+        Cache keys for a datetime Series and (already rounded) temperatures. The model
+        generation is part of the key, so forecasts of a replaced model never match.
+        """
+        days = ds.to_numpy().astype('datetime64[D]').astype(np.int64)
+        return [(generation, day, temperature) for day, temperature in zip(days.tolist(), temperatures.tolist())]
+
+    def get_many(self, keys):
+        """Cached value per key, None for misses"""
+        values = []
+        with self._lock:
+            for key in keys:
+                value = self._data.get(key)
+                if value is None:
+                    self.misses += 1
+                else:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                values.append(value)
+        return values
+
+    def put_many(self, keys, values):
+        with self._lock:
+            for key, value in zip(keys, values):
+                self._data[key] = value
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry, e.g. when the model pickle changes"""
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "temperature_decimals": self.decimals,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
@@ -0,0 +1,19 @@
+import os
+import sys
+
+# Runs inside the process pool of asgi_server.py. The pool only pickles a reference to
+# `handle`, so the FastAPI process never has to load the Prophet model itself.
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def warm_up():
+    """Pool initializer: load the model before the first request reaches the worker"""
+    import server
+    server.wait_for_model()
+
+
+def handle(handler_name, *args):
+    """Run server.<handler_name>(*args) and return its (body, status)"""
+    import server
+    return getattr(server, handler_name)(*args)
@@ -0,0 +1,132 @@
+import copy
+import itertools
+import os
+import pickle
+import re
+import threading
+from collections import OrderedDict
+
+# Series ids double as file names (<models_dir>/<series_id>.pkl), so keep them to a
+# safe alphabet: no path separators, no "..".
+SERIES_ID = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,127}")
+
+_generations = itertools.count(1)
+
+
+class UnknownSeries(KeyError):
+    pass
+
+
+def load_model(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def point_forecast_model(full_model):
+    """
+    Shallow copy of a fitted Prophet model with uncertainty sampling switched off:
+    predict() then skips the interval simulation (most of its cost) and returns yhat
+    without yhat_lower/yhat_upper. yhat itself is identical.
+    """
+    point_model = copy.copy(full_model)
+    point_model.uncertainty_samples = 0
+    return point_model
+
+
+def model_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class LoadedModel:
+    """A per-series Prophet model, its point-forecast copy and the file signature it came from"""
+
+    def __init__(self, series_id, path):
+        self.series_id = series_id
+        self.path = path
+        self.signature = model_signature(path)
+        self.model = load_model(path)
+        self.point_model = point_forecast_model(self.model)
+        self.generation = next(_generations)
+
+
+class ModelRegistry:
+    """
+    Per-series Prophet models stored as <models_dir>/<series_id>.pkl (one per warehouse
+    or product family), unpickled on first use and kept in a bounded LRU. A pickle that
+    changes on disk is reloaded on its next use.
+    """
+
+    def __init__(self, models_dir, max_loaded=32):
+        self.models_dir = models_dir
+        self.max_loaded = max_loaded
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}
+        self.hits = 0
+        self.loads = 0
+        self.reloads = 0
+        self.evictions = 0
+
+    def path_for(self, series_id):
+        if not isinstance(series_id, str) or not SERIES_ID.fullmatch(series_id):
+            raise UnknownSeries(f"Invalid model id {series_id!r}")
+        return os.path.join(self.models_dir, f"{series_id}.pkl")
+
+    def series_ids(self):
+        """Every series with a pickle in models_dir"""
+        if not os.path.isdir(self.models_dir):
+            return []
+        return sorted(name[:-4] for name in os.listdir(self.models_dir)
+                      if name.endswith(".pkl") and SERIES_ID.fullmatch(name[:-4]))
+
+    def get(self, series_id):
+        """LoadedModel for series_id, loading (or reloading) it when needed"""
+        path = self.path_for(series_id)
+        try:
+            signature = model_signature(path)
+        except FileNotFoundError:
+            raise UnknownSeries(f"No model for series {series_id!r}") from None
+
+        with self._lock:
+            entry = self._loaded.get(series_id)
+            if entry is not None and entry.signature == signature:
+                self._loaded.move_to_end(series_id)
+                self.hits += 1
+                return entry
+            # One thread unpickles, concurrent requests for the same series wait for it
+            loading = self._loading.get(series_id)
+            if loading is None:
+                loading = self._loading[series_id] = threading.Lock()
+        with loading:
+            with self._lock:
+                entry = self._loaded.get(series_id)
+                if entry is not None and entry.signature == signature:
+                    return entry
+            replaced = entry is not None
+            entry = LoadedModel(series_id, path)
+            with self._lock:
+                self._loading.pop(series_id, None)
+                self._loaded[series_id] = entry
+                self._loaded.move_to_end(series_id)
+                if replaced:
+                    self.reloads += 1
+                else:
+                    self.loads += 1
+                while len(self._loaded) > self.max_loaded:
+                    self._loaded.popitem(last=False)
+                    self.evictions += 1
+        return entry
+
+    def stats(self):
+        with self._lock:
+            return {
+                "models_dir": self.models_dir,
+                "available": len(self.series_ids()),
+                "loaded": list(self._loaded),
+                "max_loaded": self.max_loaded,
+                "hits": self.hits,
+                "loads": self.loads,
+                "reloads": self.reloads,
+                "evictions": self.evictions
+            }
@@ -2,24 +2,82 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS  # Import CORS
 import pandas as pd
 import numpy as np
-import pickle
 import os
+import threading
+import time
+from forecast_cache import ForecastCache
+from demand_table import DemandTable, model_fingerprint
+from model_registry import ModelRegistry, UnknownSeries, load_model, model_signature, point_forecast_model
 
 # -------------------------------
 # Load the pre-trained Prophet model
 # -------------------------------
-MODEL_FILENAME = 'C:\\Users\\Raouf\\Documents\\GitHub\\Tatweer_Hackathon\\code\\backend\\Ai-Demand-prediction\\prophet_model_log.pkl'
+# The pickle is loaded on a background thread, so importing this module (and starting
+# the server) is fast; GET /health reports "starting" until the model is ready.
+started_at = time.monotonic()
+current_dir = os.path.dirname(os.path.abspath(__file__))
+MODEL_FILENAME = os.getenv("DEMAND_MODEL_PATH", os.path.join(current_dir, "prophet_model_log.pkl"))
 
-# Check if the model file exists
-if not os.path.exists(MODEL_FILENAME):
-    raise FileNotFoundError(f"Model file '{MODEL_FILENAME}' not found. Please ensure it exists at the specified path.")
+# Seconds a request waits for a model that is still loading before getting a 503
+MODEL_WAIT_SECONDS = float(os.getenv("DEMAND_MODEL_WAIT", "30"))
 
-# Load the model
-try:
-    with open(MODEL_FILENAME, 'rb') as f:
-        model = pickle.load(f)
-except Exception as e:
-    raise RuntimeError(f"Error loading model: {str(e)}")
+# Seconds between checks of the pickle on disk; a replaced pickle is reloaded and the
+# forecast cache invalidated
+MODEL_CHECK_INTERVAL = float(os.getenv("DEMAND_MODEL_CHECK_INTERVAL", "5"))
+
+
+# Precomputed per-day table (python demand_table.py build) answering point forecasts
+# with a lookup and a multiply-add. Enable with DEMAND_TABLE=1; days outside the table
+# and requests with intervals still go to the model.
+USE_TABLE = os.getenv("DEMAND_TABLE", "0") == "1"
+TABLE_PATH = os.getenv("DEMAND_TABLE_PATH", os.path.join(current_dir, "demand_table.npz"))
+
+
+def load_table(model_path):
+    """The precomputed table for the pickle at model_path, None when disabled"""
+    if not USE_TABLE:
+        return None
+    table = DemandTable.load(TABLE_PATH)
+    if table.fingerprint != model_fingerprint(model_path):
+        raise RuntimeError(f"{TABLE_PATH} was built from another model pickle, rebuild it with demand_table.py build")
+    return table
+
+
+model = point_model = demand_table = None
+model_generation = 0
+loaded_signature = None
+last_model_check = 0.0
+model_lock = threading.Lock()  # held only to swap or read the model references
+reload_lock = threading.Lock()  # one check/load at a time, never waited on by requests
+
+model_status = "starting"  # then "ready", or "failed" until the pickle can be loaded
+model_error = None
+ready_seconds = None
+model_loaded = threading.Event()  # set once the first load attempt has finished
+loader_pid = None
+
+# -------------------------------
+# Forecast cache
+# -------------------------------
+# Dashboards ask for the same dates and temperatures over and over. Forecasts are
+# cached per (day, temperature), so a cached value is exactly what the model returns.
+# DEMAND_CACHE_TEMPERATURE_DECIMALS opts into lossy rounding for more hits: every
+# request's temperatures are then rounded to that many decimals before scoring, on
+# every path (table, cache, model). DEMAND_CACHE_SIZE=0 disables the cache.
+CACHE_SIZE = int(os.getenv("DEMAND_CACHE_SIZE", "10000"))
+CACHE_TEMPERATURE_DECIMALS = (int(os.getenv("DEMAND_CACHE_TEMPERATURE_DECIMALS"))
+                              if os.getenv("DEMAND_CACHE_TEMPERATURE_DECIMALS") else None)
+forecast_cache = ForecastCache(CACHE_SIZE, CACHE_TEMPERATURE_DECIMALS) if CACHE_SIZE > 0 else None
+
+# Per-series models (one per warehouse or product family) as <DEMAND_MODELS_DIR>/<id>.pkl,
+# selected with "model" in a /forecast request and unpickled on first use; at most
+# DEMAND_MAX_LOADED_MODELS stay in memory. Without "model" the default model is used.
+MODELS_DIR = os.getenv("DEMAND_MODELS_DIR", os.path.join(current_dir, "models"))
+registry = ModelRegistry(MODELS_DIR, int(os.getenv("DEMAND_MAX_LOADED_MODELS", "32")))
+
+# Whether /forecast returns forecast_lower/forecast_upper when the request does not say
+# ("intervals": true/false). /predict_demand never needs them and always skips sampling.
+FORECAST_INTERVALS = os.getenv("DEMAND_FORECAST_INTERVALS", "1") == "1"
 
 # -------------------------------
 # Create the Flask app
@@ -34,101 +92,427 @@ def home():
     """
     return "Welcome to the Prophet Forecast API! Use the `/forecast` endpoint to make predictions.", 200
 
-@app.route('/forecast', methods=['POST'])
-def forecast():
+DATE_FORMAT = '%d.%m.%Y'
+
+
+def parse_dates(dates):
+    """Parse a list of 'dd.mm.yyyy' strings in one vectorized call"""
+    return pd.to_datetime(pd.Series(dates, dtype=object), format=DATE_FORMAT)
+
+
+def refresh_model(force=False):
     """
-    Forecast endpoint. Expects a JSON payload with two lists:
-    {
-        "dates": ["01.01.2024", "02.01.2024", ...],
-        "temperatures": [10, 12, ...]
+    Load the model when the pickle on disk differs from the loaded one (or nothing is
+    loaded yet). Checked at most every MODEL_CHECK_INTERVAL seconds unless force is set.
+    """
+    if not force and time.monotonic() - last_model_check < MODEL_CHECK_INTERVAL:
+        return
+    with reload_lock:
+        reload_model(force)
+
+
+def refresh_model_in_background():
+    """Start refresh_model on a background thread when a check is due and none is running"""
+    if time.monotonic() - last_model_check < MODEL_CHECK_INTERVAL:
+        return
+    if not reload_lock.acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            reload_model(False)
+        finally:
+            reload_lock.release()
+
+    threading.Thread(target=run, name="model-reload", daemon=True).start()
+
+
+def reload_model(force):
+    """
+    Body of refresh_model, called with reload_lock held. The pickle is unpickled without
+    model_lock, so forecasts keep using the current model until the references are swapped.
+    """
+    global model, point_model, demand_table, model_generation, loaded_signature, last_model_check
+    global model_status, model_error, ready_seconds
+    if not force and time.monotonic() - last_model_check < MODEL_CHECK_INTERVAL:
+        return
+    last_model_check = time.monotonic()
+    try:
+        signature = model_signature(MODEL_FILENAME)
+        if signature == loaded_signature:
+            return
+        new_model = load_model(MODEL_FILENAME)
+    except Exception as e:
+        if model is None:
+            model_status, model_error = "failed", f"Error loading model '{MODEL_FILENAME}': {str(e)}"
+            app.logger.error(model_error)
+        else:
+            # Missing or half-written pickle: keep serving the loaded model, retry later
+            app.logger.warning(f"Model reload skipped: {str(e)}")
+        return
+    try:
+        new_table = load_table(MODEL_FILENAME)
+    except Exception as e:
+        if model is None:
+            # Refuse to start with a table of another pickle, like the first load always did
+            model_status, model_error = "failed", str(e)
+            app.logger.error(model_error)
+            return
+        # A table of the previous pickle would serve stale forecasts
+        app.logger.warning(f"Demand table disabled: {str(e)}")
+        new_table = None
+    new_point_model = point_forecast_model(new_model)
+    with model_lock:
+        model, point_model, demand_table = new_model, new_point_model, new_table
+        model_generation += 1
+    loaded_signature = signature
+    model_status, model_error = "ready", None
+    if forecast_cache is not None and model_generation > 1:
+        forecast_cache.clear()
+    if ready_seconds is None:
+        ready_seconds = time.monotonic() - started_at
+    app.logger.info(f"Loaded {MODEL_FILENAME} (generation {model_generation})")
+
+
+def load_in_background():
+    refresh_model(force=True)
+    model_loaded.set()
+
+
+def start_model_loading():
+    """Start loading the model on a background thread, once per process"""
+    global loader_pid
+    if loader_pid == os.getpid():
+        return
+    loader_pid = os.getpid()
+    threading.Thread(target=load_in_background, name="model-loader", daemon=True).start()
+
+
+def wait_for_model(timeout=None):
+    """Block until the first load attempt has finished, True if the model is ready"""
+    start_model_loading()
+    model_loaded.wait(timeout)
+    return model_status == "ready"
+
+
+def model_unavailable():
+    """Error body and 503 while the model is loading or failed to load, None once it serves"""
+    if not model_loaded.wait(MODEL_WAIT_SECONDS):
+        return {"error": "Model is still loading, please retry."}, 503
+    # Also retries a pickle that failed to load, off the request thread
+    refresh_model_in_background()
+    if model_status != "ready":
+        return {"error": f"Model unavailable: {model_error}"}, 503
+    return None
+
+
+def health_response():
+    """Body and status code of /health: 200 once the model serves, 503 while starting or failed"""
+    if model_status == "failed" and model_loaded.is_set():
+        refresh_model_in_background()
+    body = {
+        "status": model_status,
+        "model_path": MODEL_FILENAME,
+        "model_generation": model_generation,
+        "ready_seconds": ready_seconds
     }
-    The lists must be of the same length.
+    if model_error:
+        body["error"] = model_error
+    return body, 200 if model_status == "ready" else 503
+
+
+def predict_columns(current_model, df_input):
     """
-    # Parse the JSON payload
-    data = request.get_json()
+    Run the model over df_input (columns ds, temperature) and return the back-transformed
+    forecast as numpy columns aligned with the rows of df_input. Interval columns are
+    only present when the model samples them.
+    """
+    # Prophet sorts its input by ds with a stable sort, so pre-sorting the same way lets
+    # the output be scattered back to the caller's row order
+    order = np.argsort(df_input['ds'].to_numpy(), kind='stable')
+    forecast_df = current_model.predict(df_input.iloc[order])
+
+    # Inverse the log1p transformation using np.expm1 to get back to the original scale
+    columns = {}
+    for name, column in (('forecast', 'yhat'), ('forecast_lower', 'yhat_lower'), ('forecast_upper', 'yhat_upper')):
+        if column not in forecast_df:
+            continue
+        values = np.empty(len(order))
+        values[order] = np.expm1(forecast_df[column].to_numpy())
+        columns[name] = values
+    return columns
+
+
+def forecast_columns(ds, temperatures, intervals=True, model_id=None):
+    """
+    Forecast columns for aligned dates and temperatures, with forecast_lower/forecast_upper
+    only when intervals is true. model_id selects a per-series model from the registry.
+    Point forecasts of the default model come from the precomputed table where it covers
+    the day; the rest go through the cache and the model.
+    """
+    temperatures = np.asarray(temperatures, dtype=float)
+    if forecast_cache is not None:
+        # No-op unless rounding was opted into
+        temperatures = forecast_cache.round_temperatures(temperatures)
+
+    if model_id is not None:
+        entry = registry.get(model_id)
+        return cached_columns(entry.model if intervals else entry.point_model, (model_id, entry.generation),
+                              intervals, ds, temperatures)
+
+    with model_lock:
+        current_model, current_table = (model if intervals else point_model), demand_table
+        generation = model_generation
+
+    if intervals or current_table is None:
+        return cached_columns(current_model, generation, intervals, ds, temperatures)
+
+    yhat, hit = current_table.lookup(ds, temperatures)
+    forecast = np.expm1(yhat)
+    if not hit.all():
+        rest = np.flatnonzero(~hit)
+        live = cached_columns(current_model, generation, intervals,
+                              ds.iloc[rest].reset_index(drop=True), temperatures[rest])
+        forecast[rest] = live['forecast']
+    return {"forecast": forecast}
+
+
+def cached_columns(current_model, generation, intervals, ds, temperatures):
+    """
+    Forecast columns from the cache, only the distinct (day, temperature) pairs not
+    cached yet reach the model.
+    """
+    names = ['forecast', 'forecast_lower', 'forecast_upper'] if intervals else ['forecast']
+    if forecast_cache is None:
+        return predict_columns(current_model, pd.DataFrame({"ds": ds, "temperature": temperatures}))
+
+    # Point forecasts and forecasts with intervals are cached separately
+    keys = forecast_cache.keys((generation, intervals), ds, temperatures)
+    rows = forecast_cache.get_many(keys)
+    misses = {}
+    for i, row in enumerate(rows):
+        if row is None:
+            misses.setdefault(keys[i], i)
+
+    if misses:
+        positions = list(misses.values())
+        computed = predict_columns(current_model, pd.DataFrame({
+            "ds": ds.iloc[positions].to_numpy(),
+            "temperature": temperatures[positions]
+        }))
+        values = list(zip(*(computed[name].tolist() for name in names)))
+        forecast_cache.put_many(list(misses), values)
+        found = dict(zip(misses, values))
+        rows = [found[key] if row is None else row for key, row in zip(keys, rows)]
+
+    return {name: np.array(column) for name, column in zip(names, zip(*rows))}
+
+
+def read_series(data):
+    """
+    Normalise a /forecast payload to a list of (id, dates, temperatures, model id). Accepts
+    the original single-series body or
+    {"series": [{"id": ..., "model": ..., "dates": [...], "temperatures": [...]}, ...]}.
+    """
+    if "series" not in data:
+        return [(None, data.get("dates"), data.get("temperatures"), data.get("model"))]
+    series = data["series"]
+    if not isinstance(series, list) or not series:
+        raise ValueError("'series' must be a non-empty list.")
+    return [(s.get("id", i), s.get("dates"), s.get("temperatures"), s.get("model")) for i, s in enumerate(series)]
+
+
+def forecast_response(data):
+    """Body and status code of a /forecast request, shared by the Flask and ASGI servers"""
     if not data:
-        return jsonify({"error": "No input data provided. Please provide 'dates' and 'temperatures' in JSON format."}), 400
+        return {"error": "No input data provided. Please provide 'dates' and 'temperatures' in JSON format."}, 400
 
-    dates = data.get("dates")
-    temperatures = data.get("temperatures")
-    if not dates or not temperatures:
-        return jsonify({"error": "Both 'dates' and 'temperatures' must be provided."}), 400
+    try:
+        series = read_series(data)
+    except (ValueError, AttributeError) as e:
+        return {"error": str(e)}, 400
 
-    if len(dates) != len(temperatures):
-        return jsonify({"error": "Length of 'dates' and 'temperatures' must match."}), 400
+    for series_id, dates, temperatures, model_id in series:
+        prefix = "" if series_id is None else f"Series {series_id}: "
+        if model_id is not None and not isinstance(model_id, str):
+            return {"error": prefix + "'model' must be a string."}, 400
+        if not dates or not temperatures:
+            return {"error": prefix + "Both 'dates' and 'temperatures' must be provided."}, 400
+        if len(dates) != len(temperatures):
+            return {"error": prefix + "Length of 'dates' and 'temperatures' must match."}, 400
 
-    # Validate and prepare input data
+    intervals = data.get("intervals", FORECAST_INTERVALS)
+    if not isinstance(intervals, bool):
+        return {"error": "'intervals' must be true or false."}, 400
+
+    # Rows of each model, so every model is called once
+    offsets = np.cumsum([0] + [len(dates) for _, dates, _, _ in series])
+    groups = {}
+    for k, (_, _, _, model_id) in enumerate(series):
+        groups.setdefault(model_id, []).append(np.arange(offsets[k], offsets[k + 1]))
+    if None in groups:
+        unavailable = model_unavailable()
+        if unavailable:
+            return unavailable
+
+    # Validate and prepare input data, all series in one frame
     try:
-        df_input = pd.DataFrame({
-            "ds": [pd.to_datetime(d, format='%d.%m.%Y') for d in dates],
-            "temperature": temperatures
-        })
+        ds = parse_dates([d for _, dates, _, _ in series for d in dates])
     except Exception as e:
-        return jsonify({"error": f"Date conversion error: {str(e)}"}), 400
+        return {"error": f"Date conversion error: {str(e)}"}, 400
+    try:
+        temperature = np.array([t for _, _, temperatures, _ in series for t in temperatures], dtype=float)
+    except (TypeError, ValueError) as e:
+        return {"error": f"Temperature conversion error: {str(e)}"}, 400
 
     # Make predictions using the model
     try:
-        forecast_df = model.predict(df_input)
-        # Inverse the log1p transformation using np.expm1 to get back to the original scale
-        forecast_df['yhat_original'] = np.expm1(forecast_df['yhat'])
-        forecast_df['yhat_lower_original'] = np.expm1(forecast_df['yhat_lower'])
-        forecast_df['yhat_upper_original'] = np.expm1(forecast_df['yhat_upper'])
+        if len(groups) == 1:
+            columns = forecast_columns(ds, temperature, intervals, next(iter(groups)))
+        else:
+            columns = {}
+            for model_id, parts in groups.items():
+                rows = np.concatenate(parts)
+                group = forecast_columns(ds.iloc[rows].reset_index(drop=True), temperature[rows], intervals, model_id)
+                for name, values in group.items():
+                    columns.setdefault(name, np.empty(len(ds)))[rows] = values
+    except UnknownSeries as e:
+        return {"error": str(e.args[0])}, 404
     except Exception as e:
-        return jsonify({"error": f"Forecast error: {str(e)}"}), 500
+        return {"error": f"Forecast error: {str(e)}"}, 500
+
+    date_strings = ds.dt.strftime(DATE_FORMAT).tolist()
+    columns = {name: values.tolist() for name, values in columns.items()}
+
+    if "series" not in data:
+        # Original row-per-date response, in date order
+        order = np.argsort(ds.to_numpy(), kind='stable').tolist()
+        return [
+            {"date": date_strings[i], **{name: values[i] for name, values in columns.items()}}
+            for i in order
+        ], 200
 
-    # Build the results list
     results = []
-    for _, row in forecast_df.iterrows():
+    offset = 0
+    for series_id, dates, _, _ in series:
+        end = offset + len(dates)
         results.append({
-            "date": row['ds'].strftime('%d.%m.%Y'),
-            "forecast": row['yhat_original'],
-            "forecast_lower": row['yhat_lower_original'],
-            "forecast_upper": row['yhat_upper_original']
+            "id": series_id,
+            "dates": date_strings[offset:end],
+            **{name: values[offset:end] for name, values in columns.items()}
         })
+        offset = end
+    return {"series": results}, 200
 
-    return jsonify(results)
 
-@app.route('/predict_demand', methods=['POST'])
-def predict_demand():
-    """
-    Predict demand endpoint. Expects a JSON payload with:
-    {
-        "date": "01.01.2024",
-        "temperature": 10
-    }
-    """
-    data = request.get_json()
+def predict_demand_response(data):
+    """Body and status code of a /predict_demand request, shared by the Flask and ASGI servers"""
     if not data:
-        return jsonify({"error": "No input data provided. Please provide 'date' and 'temperature' in JSON format."}), 400
+        return {"error": "No input data provided. Please provide 'date' and 'temperature' in JSON format."}, 400
+    unavailable = model_unavailable()
+    if unavailable:
+        return unavailable
 
     date = data.get("date")
     temperature = data.get("temperature")
     if not date or temperature is None:
-        return jsonify({"error": "Both 'date' and 'temperature' must be provided."}), 400
+        return {"error": "Both 'date' and 'temperature' must be provided."}, 400
 
     # Validate and prepare input data
     try:
-        df_input = pd.DataFrame({
-            "ds": [pd.to_datetime(date, format='%d.%m.%Y')],
-            "temperature": [temperature]
-        })
+        ds = parse_dates([date])
     except Exception as e:
-        return jsonify({"error": f"Date conversion error: {str(e)}"}), 400
+        return {"error": f"Date conversion error: {str(e)}"}, 400
 
     # Make predictions using the model
     try:
-        forecast_df = model.predict(df_input)
-        # Inverse the log1p transformation using np.expm1 to get back to the original scale
-        forecast_df['yhat_original'] = np.expm1(forecast_df['yhat'])
+        # Only yhat is returned, so skip the interval sampling
+        columns = forecast_columns(ds, [temperature], intervals=False)
     except Exception as e:
-        return jsonify({"error": f"Forecast error: {str(e)}"}), 500
+        return {"error": f"Forecast error: {str(e)}"}, 500
 
     result = {
-        "date": forecast_df['ds'].iloc[0].strftime('%d.%m.%Y'),
-        "forecast": forecast_df['yhat_original'].iloc[0]
+        "date": ds.iloc[0].strftime(DATE_FORMAT),
+        "forecast": float(columns['forecast'][0])
     }
 
-    return jsonify(result)
+    return result, 200
+
+
+@app.route('/forecast', methods=['POST'])
+def forecast():
+    """
+    Forecast endpoint. Expects a JSON payload with two lists:
+    {
+        "dates": ["01.01.2024", "02.01.2024", ...],
+        "temperatures": [10, 12, ...]
+    }
+    The lists must be of the same length.
+
+    Several series can be forecast in one request (one model call for all of them):
+    {
+        "series": [
+            {"id": "warehouse-1", "dates": [...], "temperatures": [...]},
+            ...
+        ]
+    }
+    and are answered column-wise:
+    {
+        "series": [
+            {"id": "warehouse-1", "dates": [...], "forecast": [...],
+             "forecast_lower": [...], "forecast_upper": [...]},
+            ...
+        ]
+    }
+
+    "intervals": false (in either form) returns only the point forecast, which is much
+    faster because the model skips its uncertainty sampling.
+
+    "model": "<id>" (in either form, per series) forecasts with the per-series model
+    stored as <DEMAND_MODELS_DIR>/<id>.pkl instead of the default model.
+    """
+    # Parse the JSON payload
+    body, status = forecast_response(request.get_json())
+    return jsonify(body), status
+
+@app.route('/predict_demand', methods=['POST'])
+def predict_demand():
+    """
+    Predict demand endpoint. Expects a JSON payload with:
+    {
+        "date": "01.01.2024",
+        "temperature": 10
+    }
+    """
+    body, status = predict_demand_response(request.get_json())
+    return jsonify(body), status
+
+@app.route('/health', methods=['GET'])
+def health():
+    """
+    Readiness endpoint: {"status": "starting" | "ready" | "failed", ...}, HTTP 200 only
+    when ready, so orchestrators can route traffic once the model is warm.
+    """
+    body, status = health_response()
+    return jsonify(body), status
+
+@app.route('/models', methods=['GET'])
+def models():
+    """
+    Per-series models available in DEMAND_MODELS_DIR and the ones currently loaded.
+    """
+    return jsonify({**registry.stats(), "available_ids": registry.series_ids()})
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """
+    Hit/miss/eviction counters of the forecast cache.
+    """
+    if forecast_cache is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, "model_generation": model_generation, **forecast_cache.stats()})
+
+start_model_loading()
 
 # -------------------------------
 # Run the Flask app
@@ -0,0 +1,124 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import numpy as np
+from road_graph import RoadGraph, trees_path_for
+
+# Query latency of the offline road graph:
+#
+#   nearest     snapping a point to its nearest node
+#   a_star      first query to a destination (A* between the snapped nodes)
+#   tree_build  reverse Dijkstra tree of a destination (second query to it)
+#   eta         later queries to a known destination, snapping included
+#   precomputed first query to a destination whose tree was saved with save_trees and
+#               loaded with the graph (fleet depots and destinations)
+#
+# Also checks that A* and the trees agree, on the benchmarked graph and on a copy of it
+# with parallel edges (every edge listed twice, plus a slower duplicate), which must
+# route exactly like the original. Uses the synthetic graph unless --graph is given.
+#
+#   python benchmark_road_graph.py [--graph road_graph.npz] [--queries 2000] [--destinations 10]
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentiles(times_s):
+    ms = np.array(times_s) * 1000.0
+    return {"median_ms": float(np.median(ms)), "p99_ms": float(np.percentile(ms, 99))}
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def differs(a, b):
+    return (a is None) != (b is None) or (a is not None and abs(a - b) > 1e-3 * max(a, 1.0))
+
+
+def parallel_edge_mismatches(graph, pairs):
+    """Pairs whose A* or tree ETA on graph-with-parallel-edges differs from graph's A* ETA"""
+    u = np.repeat(np.arange(len(graph.lon)), np.diff(graph.indptr))
+    v, seconds = graph.indices, graph.seconds
+    # osmnx-style duplicate listing of every edge, and a slower road between the same nodes
+    doubled = RoadGraph.from_edges(graph.lon, graph.lat, np.concatenate([u, u, u]), np.concatenate([v, v, v]),
+                                   np.concatenate([seconds, seconds, seconds * 10]))
+    mismatches = 0
+    for start, end in pairs:
+        expected = graph.eta(start, end)
+        a_star = doubled.eta(start, end)
+        tree = doubled.eta(start, end)
+        if differs(expected, a_star) or differs(expected, tree):
+            mismatches += 1
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the offline road graph")
+    parser.add_argument("--graph", help="Graph file (default: synthetic graph)")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--destinations", type=int, default=10)
+    parser.add_argument("--output", default=os.path.join(current_dir, "benchmark_road_graph.json"))
+    args = parser.parse_args()
+
+    graph, load_s = timed(lambda: RoadGraph.load(args.graph) if args.graph else RoadGraph.synthetic())
+    rng = np.random.default_rng(0)
+    nodes = rng.integers(0, len(graph.lon), args.queries + args.destinations)
+    # Points near random nodes, so that they snap onto the graph
+    points = np.column_stack([graph.lon[nodes], graph.lat[nodes]]) + rng.uniform(-0.005, 0.005, (len(nodes), 2))
+    points = points.tolist()
+    starts, destinations = points[:args.queries], points[args.queries:]
+
+    nearest = [timed(graph.nearest_node, point)[1] for point in starts]
+
+    a_star, tree_build, eta = [], [], []
+    mismatches = 0
+    for i, end in enumerate(destinations):
+        first, elapsed = timed(graph.eta, starts[i], end)
+        a_star.append(elapsed)
+        second, elapsed = timed(graph.eta, starts[i], end)
+        tree_build.append(elapsed)
+        if differs(first, second):
+            mismatches += 1
+    parallel_mismatches = parallel_edge_mismatches(graph, list(zip(starts, destinations)))
+    for i, start in enumerate(starts):
+        eta.append(timed(graph.eta, start, destinations[i % len(destinations)])[1])
+
+    # A fresh process: graph and precomputed trees loaded from disk, then one query per destination
+    with tempfile.TemporaryDirectory() as tmp:
+        graph_path = os.path.join(tmp, "road_graph.npz")
+        graph.save(graph_path)
+        save_trees_s = timed(graph.save_trees, trees_path_for(graph_path), destinations)[1]
+        fresh, trees_load_s = timed(RoadGraph.load, graph_path)
+    precomputed = []
+    for i, end in enumerate(destinations):
+        result, elapsed = timed(fresh.eta, starts[i], end)
+        precomputed.append(elapsed)
+        if differs(graph.eta(starts[i], end), result):
+            mismatches += 1
+
+    results = {
+        "graph": graph.stats(),
+        "load_s": load_s,
+        "nearest": percentiles(nearest),
+        "a_star": percentiles(a_star),
+        "tree_build": percentiles(tree_build),
+        "eta": percentiles(eta),
+        "precomputed": percentiles(precomputed),
+        "save_trees_s": save_trees_s,
+        "load_with_trees_s": trees_load_s,
+        "a_star_tree_mismatches": mismatches,
+        "parallel_edge_mismatches": parallel_mismatches
+    }
+    print(f"graph: {results['graph']['nodes']} nodes, {results['graph']['edges']} edges, loaded in {load_s:.2f}s")
+    for name in ("nearest", "a_star", "tree_build", "eta", "precomputed"):
+        print(f"{name:<11s} median {results[name]['median_ms']:8.3f}ms   p99 {results[name]['p99_ms']:8.3f}ms")
+    print(f"{len(destinations)} trees saved in {save_trees_s:.2f}s, graph loaded with them in {trees_load_s:.2f}s")
+    print(f"A* / tree mismatches: {mismatches}, with parallel edges: {parallel_mismatches}")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f"Results saved to {args.output}")
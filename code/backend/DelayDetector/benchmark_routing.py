@@ -0,0 +1,100 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+from urllib.request import urlopen
+from fleet_monitor import batched_vehicles, checked_vehicles, demo_fleet
+from routing import OrsBackend, Router
+
+# Per-pair directions requests against matrix batching for one check cycle of a fleet,
+# on a local routing_stub.py with a fixed per-request latency (the ETA cache is off):
+#
+#   per-pair   two directions requests per vehicle
+#   batch      the cycle's routes packed into matrix requests of at most --max-elements
+#
+# Reports routing calls and wall time per fleet size, and checks that both paths give
+# the same delays.
+#
+#   python benchmark_routing.py [--vehicles 10 100 1000] [--latency-ms 50] [--connections 20]
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_stub(port, latency_ms, max_elements):
+    stub = subprocess.Popen([
+        sys.executable, os.path.join(current_dir, "routing_stub.py"), "--port", str(port),
+        "--latency-ms", str(latency_ms), "--max-elements", str(max_elements)
+    ], stdout=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            urlopen(f"http://127.0.0.1:{port}/stats").read()
+            return stub
+        except OSError:
+            time.sleep(0.05)
+    stub.kill()
+    raise RuntimeError("The routing stub did not start")
+
+
+async def run(url, vehicles, now, batch, connections, max_elements):
+    router = Router(OrsBackend(url, connections=connections, max_elements=max_elements), cache=None)
+    results = batched_vehicles(router, vehicles, now) if batch else checked_vehicles(router, vehicles, now)
+    started = time.perf_counter()
+    events = {vehicle_id: event async for vehicle_id, event in results}
+    elapsed = time.perf_counter() - started
+    await router.aclose()
+    return events, router.backend.calls, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-pair routing against matrix batching")
+    parser.add_argument("--vehicles", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--connections", type=int, default=20)
+    parser.add_argument("--max-elements", type=int, default=3500)
+    parser.add_argument("--output", default=os.path.join(current_dir, "benchmark_routing.json"))
+    args = parser.parse_args()
+
+    port = free_port()
+    stub = start_stub(port, args.latency_ms, args.max_elements)
+    url = f"http://127.0.0.1:{port}"
+    results = []
+    try:
+        for n in args.vehicles:
+            now = datetime.now()
+            vehicles = demo_fleet(n, now=now)
+            single, single_calls, single_s = asyncio.run(
+                run(url, vehicles, now, False, args.connections, args.max_elements))
+            batched, batch_calls, batch_s = asyncio.run(
+                run(url, vehicles, now, True, args.connections, args.max_elements))
+            if None in single.values() or single.keys() != batched.keys():
+                raise RuntimeError("Routing requests failed, see the errors above")
+            difference = max(abs(single[v]["delay_hours"] - batched[v]["delay_hours"]) for v in single)
+            run_result = {
+                "vehicles": n,
+                "per_pair_calls": single_calls,
+                "per_pair_s": single_s,
+                "batch_calls": batch_calls,
+                "batch_s": batch_s,
+                "max_delay_difference_hours": difference
+            }
+            results.append(run_result)
+            print(f"vehicles={n:<5d} per-pair: {single_calls:5d} calls {single_s:7.2f}s   "
+                  f"batch: {batch_calls:3d} calls {batch_s:6.2f}s   "
+                  f"speedup x{single_s / batch_s:.1f}   max delay difference {difference:.1e}h")
+    finally:
+        stub.kill()
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f"Results saved to {args.output}")
@@ -0,0 +1,160 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# Persistent cache of routing durations, shared by main.get_eta and fleet_monitor.py.
+#
+# Coordinates are snapped to a grid of ETA_CACHE_GRID degrees (0.005 is about 500 m) so
+# that nearby positions on the same corridor reuse one routing call. Live legs (current
+# position -> destination) expire after ETA_CACHE_TTL seconds, or ETA_CACHE_PEAK_TTL
+# during ETA_CACHE_PEAK_HOURS when traffic changes faster. Planned legs (departure ->
+# destination) do not move and are kept for PLANNED_ETA_TTL. The two are cached under
+# separate keys: a vehicle still near its departure must not get the planned duration
+# back as its live ETA. Stored in SQLite (WAL), opened on first use, so the cache
+# survives restarts and is shared between processes.
+#
+#   python eta_cache.py stats | purge | clear
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_PATH = os.path.join(current_dir, "eta_cache.sqlite3")
+
+
+def parse_hours(spec):
+    """'7-10,16-19' -> set of hours 7, 8, 9, 16, 17, 18"""
+    hours = set()
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        first, _, last = part.partition("-")
+        hours.update(range(int(first), int(last or int(first) + 1)))
+    return hours
+
+
+class EtaCache:
+    def __init__(self, path=DEFAULT_PATH, grid=0.005, ttl=3600.0, peak_ttl=600.0, peak_hours="7-10,16-19",
+                 planned_ttl=24 * 3600.0):
+        self.path = path
+        self.grid = grid
+        self.ttl = ttl
+        self.peak_ttl = peak_ttl
+        self.peak_hours = parse_hours(peak_hours)
+        self.planned_ttl = planned_ttl
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.stores = 0
+        self._lock = threading.Lock()
+        self._connection = None
+
+    @property
+    def _db(self):
+        # Callers hold self._lock
+        if self._connection is None:
+            db = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS eta ("
+                "route TEXT PRIMARY KEY, duration REAL NOT NULL, stored_at REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._connection = db
+        return self._connection
+
+    @classmethod
+    def from_env(cls):
+        """Cache configured by the ETA_CACHE_* variables, None when ETA_CACHE=0"""
+        if os.getenv("ETA_CACHE", "1") == "0":
+            return None
+        return cls(
+            os.getenv("ETA_CACHE_PATH", DEFAULT_PATH),
+            grid=float(os.getenv("ETA_CACHE_GRID", "0.005")),
+            ttl=float(os.getenv("ETA_CACHE_TTL", "3600")),
+            peak_ttl=float(os.getenv("ETA_CACHE_PEAK_TTL", "600")),
+            peak_hours=os.getenv("ETA_CACHE_PEAK_HOURS", "7-10,16-19"),
+            planned_ttl=float(os.getenv("PLANNED_ETA_TTL", str(24 * 3600)))
+        )
+
+    def route_key(self, start, end, planned=False):
+        """Leg class and both [lon, lat] points snapped to grid cells"""
+        cells = (round(value / self.grid) for value in (*start, *end))
+        return ":".join(["planned" if planned else "live", *map(str, cells)])
+
+    def ttl_at(self, when=None, planned=False):
+        if planned:
+            return self.planned_ttl
+        hour = (when or datetime.now()).hour
+        return self.peak_ttl if hour in self.peak_hours else self.ttl
+
+    def get(self, start, end, planned=False):
+        """Cached duration in seconds of a planned or live leg, None on a miss or an expired entry"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT duration, expires_at FROM eta WHERE route = ?", (self.route_key(start, end, planned),)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if row[1] <= time.time():
+                self.expired += 1
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, start, end, duration, planned=False):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO eta (route, duration, stored_at, expires_at) VALUES (?, ?, ?, ?)",
+                (self.route_key(start, end, planned), duration, now, now + self.ttl_at(planned=planned))
+            )
+            self.stores += 1
+
+    def purge(self):
+        """Deletes expired entries, returns how many"""
+        with self._lock:
+            return self._db.execute("DELETE FROM eta WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM eta")
+
+    def stats(self):
+        with self._lock:
+            entries, live = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(expires_at > ?), 0) FROM eta", (time.time(),)
+            ).fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "stores": self.stores,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+                "live_entries": live
+            }
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or maintain the ETA cache")
+    parser.add_argument("command", choices=["stats", "purge", "clear"])
+    args = parser.parse_args()
+
+    cache = EtaCache.from_env()
+    if cache is None:
+        raise SystemExit("The ETA cache is disabled (ETA_CACHE=0)")
+    if args.command == "purge":
+        print(f"Deleted {cache.purge()} expired entries")
+    elif args.command == "clear":
+        cache.clear()
+        print("Cleared the ETA cache")
+    print(cache.stats())
@@ -0,0 +1,229 @@
+import argparse
+import json
+import os
+import sys
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends stay atomic, but compaction is not locked against other processes
+    fcntl = None
+
+# Delay event store: delay_events.json is a snapshot ({event id: event}, the format the
+# voice assistant's EventMonitor reads) and delay_events.ndjson an append-only log of
+# {"id": ..., "event": ...} lines written since. The latest line for an id wins.
+#
+# Recording an event is a single O_APPEND write, whatever the size of the history, and
+# concurrent writers never rewrite each other's data. The log is compacted into the
+# snapshot once it outgrows the snapshot (so rewrites stay amortized constant per
+# event): under an exclusive lock, the merged snapshot replaces the old one atomically
+# and the log is truncated. Readers keep an index by event id and status that follows
+# the log incrementally.
+#
+#   python event_store.py stats | compact | get EVENT_ID | status STATUS
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_PATH = os.path.join(current_dir, "delay_events.json")
+
+
+def log_path_for(snapshot_path):
+    return os.path.splitext(snapshot_path)[0] + ".ndjson"
+
+
+def read_log(f):
+    """
+    (event id, event) per complete line of an open binary log, and the bytes consumed.
+    Unreadable lines (a torn write after a crash, a bad hand edit) are skipped.
+    """
+    records = []
+    consumed = 0
+    for line in f:
+        if not line.endswith(b"\n"):
+            # A line still being written by another process
+            break
+        consumed += len(line)
+        if line.strip():
+            try:
+                record = json.loads(line)
+                records.append((record["id"], record["event"]))
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"Skipping unreadable event log line: {e}", file=sys.stderr)
+    return records, consumed
+
+
+class EventStore:
+    def __init__(self, path=DEFAULT_PATH, min_compact_bytes=1 << 20, compact_ratio=1.0):
+        self.path = path
+        self.log_path = log_path_for(path)
+        self.lock_path = os.path.splitext(path)[0] + ".lock"
+        self.min_compact_bytes = min_compact_bytes
+        self.compact_ratio = compact_ratio
+        self._mutex = threading.RLock()
+        self._log_fd = None
+        self._lock_fd = None
+        # Index, built on the first query
+        self._loaded = False
+        self._offset = 0
+        self._snapshot = None
+        self.events = {}
+        self.by_status = defaultdict(set)
+
+    @contextmanager
+    def _locked(self, exclusive=False):
+        """Appenders share the lock, compaction holds it alone"""
+        if self._lock_fd is None:
+            self._lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def append(self, event_id, event):
+        self.append_many([(event_id, event)])
+
+    def append_many(self, records):
+        """Appends (event id, event) records in one write"""
+        data = "".join(json.dumps({"id": event_id, "event": event}) + "\n" for event_id, event in records).encode()
+        with self._mutex:
+            with self._locked():
+                if self._log_fd is None:
+                    self._log_fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                os.write(self._log_fd, data)
+                log_size = os.fstat(self._log_fd).st_size
+            threshold = self._compact_threshold()
+            if log_size > threshold:
+                self.compact(threshold)
+
+    def _compact_threshold(self):
+        try:
+            snapshot_size = os.stat(self.path).st_size
+        except FileNotFoundError:
+            snapshot_size = 0
+        return max(self.min_compact_bytes, snapshot_size * self.compact_ratio)
+
+    def _read_snapshot(self):
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def compact(self, above_bytes=0):
+        """
+        Merges the log into the snapshot and truncates it; returns the number of events,
+        or None when the log is not larger than above_bytes (another writer compacted it)
+        """
+        with self._mutex, self._locked(exclusive=True):
+            if above_bytes and os.path.exists(self.log_path) and os.path.getsize(self.log_path) <= above_bytes:
+                return None
+            events = self._read_snapshot()
+            if os.path.exists(self.log_path):
+                with open(self.log_path, 'rb') as f:
+                    records, _ = read_log(f)
+                events.update(records)
+            temporary = f"{self.path}.{os.getpid()}.tmp"
+            with open(temporary, 'w') as f:
+                json.dump(events, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            # A crash before the truncate only replays lines the snapshot already has
+            os.replace(temporary, self.path)
+            if os.path.exists(self.log_path):
+                os.truncate(self.log_path, 0)
+            if self._loaded:
+                self._reset(events)
+            return len(events)
+
+    def _snapshot_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _reset(self, events):
+        self.events = {}
+        self.by_status = defaultdict(set)
+        for event_id, event in events.items():
+            self._index(event_id, event)
+        self._offset = 0
+        self._snapshot = self._snapshot_signature()
+        self._loaded = True
+
+    def _index(self, event_id, event):
+        previous = self.events.get(event_id)
+        if previous is not None:
+            self.by_status[previous.get("status")].discard(event_id)
+        self.events[event_id] = event
+        self.by_status[event.get("status")].add(event_id)
+
+    def refresh(self):
+        """Brings the index up to date with the snapshot and the log"""
+        with self._mutex:
+            try:
+                log_size = os.stat(self.log_path).st_size
+            except FileNotFoundError:
+                log_size = 0
+            compacted = self._snapshot_signature() != self._snapshot
+            if self._loaded and not compacted and log_size == self._offset:
+                return
+            with self._locked():
+                if not self._loaded or self._snapshot_signature() != self._snapshot or log_size < self._offset:
+                    # First load, or another process compacted the log since
+                    self._reset(self._read_snapshot())
+                if os.path.exists(self.log_path):
+                    with open(self.log_path, 'rb') as f:
+                        f.seek(self._offset)
+                        records, consumed = read_log(f)
+                    for event_id, event in records:
+                        self._index(event_id, event)
+                    self._offset += consumed
+
+    def get(self, event_id):
+        self.refresh()
+        return self.events.get(event_id)
+
+    def with_status(self, *statuses):
+        self.refresh()
+        return {event_id: self.events[event_id] for status in statuses for event_id in self.by_status.get(status, ())}
+
+    def all(self):
+        self.refresh()
+        return dict(self.events)
+
+    def stats(self):
+        self.refresh()
+        return {
+            "events": len(self.events),
+            "by_status": {status: len(ids) for status, ids in self.by_status.items() if ids},
+            "snapshot_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            "log_bytes": self._offset
+        }
+
+    def close(self):
+        for fd in (self._log_fd, self._lock_fd):
+            if fd is not None:
+                os.close(fd)
+        self._log_fd = self._lock_fd = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or compact the delay event store")
+    parser.add_argument("command", choices=["stats", "compact", "get", "status"])
+    parser.add_argument("value", nargs="?", help="Event id for get, status for status")
+    parser.add_argument("--path", default=os.getenv("DELAY_EVENTS_PATH", DEFAULT_PATH))
+    args = parser.parse_args()
+
+    store = EventStore(args.path)
+    if args.command == "compact":
+        print(f"Compacted {store.compact()} events into {store.path}")
+    elif args.command == "get":
+        print(json.dumps(store.get(args.value), indent=2))
+    elif args.command == "status":
+        print(json.dumps(store.with_status(args.value), indent=2))
+    print(json.dumps(store.stats()))
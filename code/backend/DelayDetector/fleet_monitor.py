@@ -0,0 +1,221 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from main import compute_delays, eta_cache, event_store, format_delay_event
+from routing import BACKENDS, ORS_MAX_ELEMENTS, Router
+
+# Long-running delay monitor for a fleet of vehicles.
+#
+#   python fleet_monitor.py --fleet fleet.json [--interval 300] [--connections 20] [--output events.ndjson]
+#   python fleet_monitor.py --demo 500 --once [--batch] [--backend local]   # synthetic fleet, one cycle
+#
+# Every cycle re-reads the fleet file when it changed, requests both ETAs of every
+# vehicle concurrently (planned: departure -> destination, current: position ->
+# destination) over one HTTP connection pool bounded to --connections, and emits each
+# vehicle's delay event as soon as its two ETAs are in: one JSON line per event, on
+# stdout or appended to --output. With --batch the cycle's ETAs are requested in a few
+# matrix requests instead of one directions request per route (see routing.py), and
+# --backend local replaces the routing API with an in-process stand-in.
+#
+# --events-json also records every event in the delay event store (event_store.py,
+# delay_events.json keyed by vehicle id) for the voice assistant's event monitor.
+#
+# ETAs go through the same persistent cache as main.get_eta (eta_cache.py), and
+# vehicles asking for the same snapped route at the same time share one routing call.
+#
+# Fleet file: a JSON list of vehicles
+#   {"id": "TRUCK_001", "departure": [lon, lat], "position": [lon, lat], "destination": [lon, lat],
+#    "planned_departure": "2025-02-08 00:00:00", "location": "Constantine", "impact": ["Annaba_Distribution"]}
+# "location" (defaults to the position) and "impact" are optional.
+#
+# Set ROUTING_URL=http://127.0.0.1:8090 and run routing_stub.py to monitor without the real API.
+
+CITIES = {
+    "Algiers": [3.0861, 36.7372],
+    "Oran": [-0.6331, 35.6971],
+    "Constantine": [6.6147, 36.3650],
+    "Annaba": [7.7667, 36.9000],
+    "Setif": [5.4137, 36.1911],
+    "Blida": [2.8277, 36.4701],
+    "Batna": [6.1741, 35.5559],
+    "Bejaia": [5.0843, 36.7509],
+    "Tlemcen": [-1.3150, 34.8783],
+    "Biskra": [5.7280, 34.8504]
+}
+
+
+def load_fleet(path):
+    with open(path, 'r') as f:
+        vehicles = json.load(f)
+    for vehicle in vehicles:
+        vehicle["planned_departure"] = datetime.fromisoformat(vehicle["planned_departure"])
+    return vehicles
+
+
+def demo_fleet(size, seed=0, now=None):
+    """Synthetic fleet: trucks between Algerian cities, somewhere along their trip"""
+    rng = random.Random(seed)
+    now = now or datetime.now()
+    names = list(CITIES)
+    vehicles = []
+    for i in range(size):
+        origin, destination = rng.sample(names, 2)
+        progress = rng.random()
+        start, end = CITIES[origin], CITIES[destination]
+        position = [round(a + (b - a) * progress + rng.uniform(-0.05, 0.05), 4) for a, b in zip(start, end)]
+        vehicles.append({
+            "id": f"TRUCK_{i + 1:04d}",
+            "departure": start,
+            "position": position,
+            "destination": end,
+            "planned_departure": now - timedelta(minutes=rng.uniform(0, 8 * 60) * progress),
+            "impact": [f"{destination}_Distribution"]
+        })
+    return vehicles
+
+
+class FleetSource:
+    """The fleet file, re-read when it changes on disk"""
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = None
+        self.vehicles = []
+
+    def current(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime != self.mtime:
+            self.vehicles = load_fleet(self.path)
+            self.mtime = mtime
+        return self.vehicles
+
+
+def vehicle_event(vehicle, planned_eta, current_eta, now):
+    """Delay event of one vehicle, None when an ETA is missing"""
+    if planned_eta is None or current_eta is None:
+        return None
+    delays = compute_delays(planned_eta, current_eta, vehicle["planned_departure"], now)
+    location = vehicle.get("location") or "{1:.4f},{0:.4f}".format(*vehicle["position"])
+    return format_delay_event(delays, location, vehicle.get("impact", []), now)
+
+
+async def check_vehicle(router, index, vehicle, now):
+    planned_eta, current_eta = await asyncio.gather(
+        router.eta(vehicle["departure"], vehicle["destination"], planned=True, index=index),
+        router.eta(vehicle["position"], vehicle["destination"], index=index)
+    )
+    return vehicle["id"], vehicle_event(vehicle, planned_eta, current_eta, now)
+
+
+async def checked_vehicles(router, vehicles, now):
+    """(vehicle id, event) in completion order, one routing request per route"""
+    tasks = [asyncio.create_task(check_vehicle(router, i, vehicle, now)) for i, vehicle in enumerate(vehicles)]
+    for finished in asyncio.as_completed(tasks):
+        yield await finished
+
+
+async def batched_vehicles(router, vehicles, now):
+    """(vehicle id, event) as matrix requests complete, all the cycle's routes in a few requests"""
+    pairs, planned = [], []
+    for vehicle in vehicles:
+        pairs += [(vehicle["departure"], vehicle["destination"]), (vehicle["position"], vehicle["destination"])]
+        planned += [True, False]
+    durations = {}
+    async for resolved in router.eta_batches(pairs, planned):
+        durations.update(resolved)
+        # Pair 2i is vehicle i's planned leg, 2i + 1 its current one
+        for i in sorted({pair // 2 for pair in resolved}):
+            if 2 * i in durations and 2 * i + 1 in durations:
+                vehicle = vehicles[i]
+                yield vehicle["id"], vehicle_event(vehicle, durations[2 * i], durations[2 * i + 1], now)
+
+
+async def run_cycle(router, vehicles, emit, batch=False):
+    """Checks every vehicle concurrently, emitting events in completion order"""
+    now = datetime.now()
+    stats = {"vehicles": len(vehicles), "delayed": 0, "failed": 0}
+    calls = router.backend.calls
+    hits, misses = (eta_cache.hits, eta_cache.misses) if eta_cache is not None else (0, 0)
+    results = batched_vehicles(router, vehicles, now) if batch else checked_vehicles(router, vehicles, now)
+    async for vehicle_id, event in results:
+        if event is None:
+            stats["failed"] += 1
+            continue
+        if event["status"] == "delayed":
+            stats["delayed"] += 1
+        emit(vehicle_id, event)
+    stats["routing_calls"] = router.backend.calls - calls
+    if eta_cache is not None:
+        lookups = eta_cache.hits + eta_cache.misses - hits - misses
+        stats["cache_hit_rate"] = (eta_cache.hits - hits) / lookups if lookups else 0.0
+    return stats
+
+
+class EventWriter:
+    """One JSON line per event, flushed immediately, and optionally recorded in an event store"""
+
+    def __init__(self, output=None, store=None):
+        self.stream = open(output, 'a') if output else sys.stdout
+        self.store = store
+
+    def __call__(self, vehicle_id, event):
+        self.stream.write(json.dumps({"id": vehicle_id, **event}) + "\n")
+        self.stream.flush()
+        if self.store is not None:
+            self.store.append(vehicle_id, event)
+
+    def close(self):
+        if self.stream is not sys.stdout:
+            self.stream.close()
+
+
+async def monitor(args):
+    source = FleetSource(args.fleet) if args.fleet else None
+    vehicles = None if source else demo_fleet(args.demo)
+    writer = EventWriter(args.output, event_store if args.events_json else None)
+    backend = BACKENDS[args.backend](connections=args.connections, timeout=args.timeout,
+                                     max_elements=args.max_elements)
+    router = Router(backend)
+    try:
+        while True:
+            started = time.perf_counter()
+            stats = await run_cycle(router, source.current() if source else vehicles, writer, args.batch)
+            elapsed = time.perf_counter() - started
+            cache = f", ETA cache hit rate {stats['cache_hit_rate']:.0%}" if eta_cache is not None else ""
+            print(f"{datetime.now():%Y-%m-%d %H:%M:%S} checked {stats['vehicles']} vehicles in {elapsed:.2f}s: "
+                  f"{stats['delayed']} delayed, {stats['failed']} failed, "
+                  f"{stats['routing_calls']} routing calls{cache}", file=sys.stderr)
+            if args.once:
+                return stats
+            await asyncio.sleep(max(0.0, args.interval - elapsed))
+    finally:
+        await router.aclose()
+        writer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Continuous delay monitoring for a fleet of vehicles")
+    fleet = parser.add_mutually_exclusive_group(required=True)
+    fleet.add_argument("--fleet", help="JSON file with the fleet's vehicles")
+    fleet.add_argument("--demo", type=int, metavar="N", help="Monitor N synthetic vehicles")
+    parser.add_argument("--interval", type=float, default=300.0, help="Seconds between check cycles")
+    parser.add_argument("--once", action="store_true", help="Run a single check cycle and exit")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="ors", help="Routing backend")
+    parser.add_argument("--batch", action="store_true", help="Request the cycle's ETAs in matrix batches")
+    parser.add_argument("--max-elements", type=int, default=ORS_MAX_ELEMENTS,
+                        help="Maximum sources x destinations per matrix request")
+    parser.add_argument("--connections", type=int, default=20, help="Maximum concurrent routing connections")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Routing request timeout in seconds")
+    parser.add_argument("--output", help="Append events to this NDJSON file instead of stdout")
+    parser.add_argument("--events-json", action="store_true", help="Also record events in delay_events.json")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(monitor(args))
+    except KeyboardInterrupt:
+        pass
@@ -2,19 +2,36 @@ import requests
 import json
 import os
 from datetime import datetime, timedelta
+from eta_cache import EtaCache
+from event_store import EventStore
 
-API_KEY = '5b3ce3597851110001cf6248f786fdc79a2449c1b8c4b1a8ed0369af'
+API_KEY = os.getenv("ORS_API_KEY", '5b3ce3597851110001cf6248f786fdc79a2449c1b8c4b1a8ed0369af')
 
 # Coordinates
 algiers = [3.0861, 36.7372]  # Departure
 constantine = [6.6147, 36.3650]  # Real-time position
 annaba = [7.7667, 36.9000]  # Destination
 
-# OpenRouteService API URL
-api_url = "https://api.openrouteservice.org/v2/directions/driving-car"
+# OpenRouteService API URL (point ROUTING_URL at routing_stub.py to run without the real API)
+ROUTING_URL = os.getenv("ROUTING_URL", "https://api.openrouteservice.org")
+api_url = f"{ROUTING_URL}/v2/directions/driving-car"
 
 # Add this constant at the top
-EVENTS_JSON_PATH = os.path.join(os.path.dirname(__file__), 'delay_events.json')
+EVENTS_JSON_PATH = os.getenv("DELAY_EVENTS_PATH", os.path.join(os.path.dirname(__file__), 'delay_events.json'))
+
+# Events are appended to an NDJSON log next to delay_events.json and compacted into it
+# (see event_store.py), instead of rewriting the whole file for every event
+event_store = EventStore(EVENTS_JSON_PATH)
+
+# Routing durations are cached on disk (see eta_cache.py), the file is opened on first
+# use; the planned leg of a trip does not change, so it is kept for PLANNED_ETA_TTL
+# instead of the traffic-based TTL, under its own keys
+eta_cache = EtaCache.from_env()
+
+# Offline road network (see road_graph.py); when the file exists, get_eta routes on it
+# and only calls the routing API for points it cannot route
+ROAD_GRAPH_PATH = os.getenv("ROAD_GRAPH_PATH", os.path.join(os.path.dirname(__file__), 'road_graph.npz'))
+_road_graph = None
 
 # Function to convert seconds to hours, minutes, and seconds
 def format_time(seconds):
@@ -23,8 +40,25 @@ def format_time(seconds):
     secs = int(seconds % 60)
     return f"{hours}h {minutes}m {secs}s"
 
+def get_road_graph():
+    """The offline road graph, loaded on first use; None without a graph file or with ROAD_GRAPH=0"""
+    global _road_graph
+    if _road_graph is None and os.getenv("ROAD_GRAPH", "1") != "0" and os.path.exists(ROAD_GRAPH_PATH):
+        from road_graph import RoadGraph
+        _road_graph = RoadGraph.load(ROAD_GRAPH_PATH)
+    return _road_graph
+
 # Function to get ETA
-def get_eta(start, end):
+def get_eta(start, end, planned=False):
+    road_graph = get_road_graph()
+    if road_graph is not None:
+        duration = road_graph.eta(start, end)
+        if duration is not None:
+            return duration
+    if eta_cache is not None:
+        cached = eta_cache.get(start, end, planned)
+        if cached is not None:
+            return cached
     response = requests.post(
         api_url,
         headers={"Authorization": API_KEY, "Content-Type": "application/json"},
@@ -37,107 +71,128 @@ def get_eta(start, end):
     if response.status_code == 200:
         data = response.json()
         duration = data["routes"][0]["summary"]["duration"]  # Duration in seconds
+        if eta_cache is not None:
+            eta_cache.put(start, end, duration, planned)
         return duration
     else:
         print("Error:", response.status_code, response.text)
         return None
 
 def load_existing_events():
-    if os.path.exists(EVENTS_JSON_PATH):
-        with open(EVENTS_JSON_PATH, 'r') as f:
-            return json.load(f)
-    return {}
+    return event_store.all()
 
-def save_events(events):
-    with open(EVENTS_JSON_PATH, 'w') as f:
-        json.dump(events, f, indent=4)
+def compute_delays(planned_eta, current_eta, departure_time, current_time):
+    """
+    Delays of a trip from the planned ETA (departure -> destination), the current ETA
+    (current position -> destination), the planned departure time and the current time
+    """
+    # Calculate the planned arrival time
+    planned_arrival_time = departure_time + timedelta(seconds=planned_eta)
 
-# Planned departure time from Algiers
-departure_time = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    # Calculate time spent traveling so far
+    time_spent = (current_time - departure_time).total_seconds()
 
-# Current time
-current_time = datetime.now().replace(hour=4, minute=1, second=0, microsecond=0)
+    # Travel time expected from the departure to the current position
+    travel_to_position = planned_eta - current_eta
 
-# current_time = datetime.now()
+    return {
+        "planned_arrival_time": planned_arrival_time,
+        "time_spent": time_spent,
+        # **Planned Delay**: Time deviation from the planned schedule
+        "planned_delay": time_spent - travel_to_position,
+        # **Real-Time Delay**: Time deviation based on current position and ETA
+        "real_time_delay": (time_spent + current_eta) - planned_eta
+    }
 
-# Planned ETA from Algiers to Annaba
-planned_eta = get_eta(algiers, annaba)
 
-# Current ETA from Constantine to Annaba
-current_eta = get_eta(constantine, annaba)
+def format_delay_event(delays, location, impact, event_time=None):
+    """Delay event in the delay_events.json format"""
+    event_time = event_time or datetime.now()
+    real_time_delay = delays["real_time_delay"]
+    return {
+        "type": "logistics",
+        "status": "delayed" if real_time_delay > 0 else "on_track",
+        "delay_hours": real_time_delay / 3600,
+        "location": location,
+        "impact": impact,
+        "details": f"Transport delay of {format_time(real_time_delay)} detected",
+        "planned_arrival": delays["planned_arrival_time"].strftime("%H:%M:%S"),
+        "current_position": location,
+        "timestamp": event_time.strftime("%Y-%m-%d %H:%M:%S")
+    }
 
-# Detect delays
-if planned_eta and current_eta:
-    # Calculate the planned arrival time
-    planned_arrival_time = departure_time + timedelta(seconds=planned_eta)
-    
-    # Calculate time spent traveling so far
-    time_spent = (current_time - departure_time).total_seconds()
 
-    # Travel time expected from Algiers to Constantine
-    travel_to_constantine = planned_eta - current_eta
+def demo_trip():
+    """The Algiers -> Constantine -> Annaba trip: (departure_time, current_time, planned_eta, current_eta)"""
+    # Planned departure time from Algiers
+    departure_time = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
 
-    # **Planned Delay**: Time deviation from the planned schedule
-    planned_delay = time_spent - travel_to_constantine
+    # Current time
+    current_time = datetime.now().replace(hour=4, minute=1, second=0, microsecond=0)
 
-    # **Real-Time Delay**: Time deviation based on current position and ETA
-    real_time_delay = (time_spent + current_eta) - planned_eta
+    # current_time = datetime.now()
 
-    # Output results
-    print("Planned ETA:", format_time(planned_eta))
-    print("Current ETA:", format_time(current_eta))
-    print("Planned Arrival Time:", planned_arrival_time.strftime("%H:%M:%S"))
-    print("Current Time:", current_time.strftime("%H:%M:%S"))
-    print("Time Spent Traveling:", format_time(time_spent))
+    # Planned ETA from Algiers to Annaba
+    planned_eta = get_eta(algiers, annaba, planned=True)
 
-    # Planned delay
-    if planned_delay > 0:
-        print(f"Planned Delay: {format_time(planned_delay)} behind schedule.")
-    else:
-        print(f"On track with no planned delay.")
+    # Current ETA from Constantine to Annaba
+    current_eta = get_eta(constantine, annaba)
+
+    return departure_time, current_time, planned_eta, current_eta
 
-    # Real-time delay
-    if real_time_delay > 0:
-        print(f"Real-Time Delay: {format_time(real_time_delay)} behind schedule.")
+
+def print_delays(departure_time, current_time, planned_eta, current_eta):
+    # Detect delays
+    if planned_eta and current_eta:
+        delays = compute_delays(planned_eta, current_eta, departure_time, current_time)
+        planned_delay = delays["planned_delay"]
+        real_time_delay = delays["real_time_delay"]
+
+        # Output results
+        print("Planned ETA:", format_time(planned_eta))
+        print("Current ETA:", format_time(current_eta))
+        print("Planned Arrival Time:", delays["planned_arrival_time"].strftime("%H:%M:%S"))
+        print("Current Time:", current_time.strftime("%H:%M:%S"))
+        print("Time Spent Traveling:", format_time(delays["time_spent"]))
+
+        # Planned delay
+        if planned_delay > 0:
+            print(f"Planned Delay: {format_time(planned_delay)} behind schedule.")
+        else:
+            print(f"On track with no planned delay.")
+
+        # Real-time delay
+        if real_time_delay > 0:
+            print(f"Real-Time Delay: {format_time(real_time_delay)} behind schedule.")
+        else:
+            print(f"On track with no real-time delay.")
     else:
-        print(f"On track with no real-time delay.")
-else:
-    print("Failed to calculate delays.")
+        print("Failed to calculate delays.")
 
-def get_formatted_delay_event():
+
+def get_formatted_delay_event(trip=None):
+    departure_time, current_time, planned_eta, current_eta = trip or demo_trip()
     if planned_eta and current_eta:
         # Calculate delays
-        planned_arrival_time = departure_time + timedelta(seconds=planned_eta)
-        time_spent = (current_time - departure_time).total_seconds()
-        travel_to_constantine = planned_eta - current_eta
-        real_time_delay = (time_spent + current_eta) - planned_eta
+        delays = compute_delays(planned_eta, current_eta, departure_time, current_time)
 
         # Create unique event ID
         event_id = f"TRANSPORT_{datetime.now().strftime('%Y%m%d_%H%M')}"
 
-        # Load existing events
-        events = load_existing_events()
-
-        # Add new event
-        events[event_id] = {
-            "type": "logistics",
-            "status": "delayed" if real_time_delay > 0 else "on_track",
-            "delay_hours": real_time_delay / 3600,
-            "location": "Constantine",
-            "impact": ["Annaba_Distribution", "Regional_Delivery_Network"],
-            "details": f"Transport delay of {format_time(real_time_delay)} detected",
-            "planned_arrival": planned_arrival_time.strftime("%H:%M:%S"),
-            "current_position": "Constantine",
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
+        event = format_delay_event(
+            delays, "Constantine", ["Annaba_Distribution", "Regional_Delivery_Network"]
+        )
 
-        # Save updated events
-        save_events(events)
-        return events[event_id]
+        # Record the new event
+        event_store.append(event_id, event)
+        return event
     return None
 
 if __name__ == "__main__":
-    delay_event = get_formatted_delay_event()
+    # The ETAs are only requested here, importing this module makes no API calls
+    trip = demo_trip()
+    print_delays(*trip)
+    delay_event = get_formatted_delay_event(trip)
     if delay_event:
         print("New delay event detected and saved:")
         print(json.dumps(delay_event, indent=2))
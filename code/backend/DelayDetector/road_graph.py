@@ -0,0 +1,406 @@
+import argparse
+import csv
+import hashlib
+import heapq
+import json
+import math
+import os
+from collections import OrderedDict
+import numpy as np
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra
+except ImportError:  # destination trees fall back to the pure Python Dijkstra
+    csr_matrix = None
+
+# Offline routing on a road network extract, so that ETAs need no routing API.
+#
+# The graph is compiled once from an OSM-derived edge list into compact arrays:
+#
+#   python road_graph.py build --nodes nodes.csv --edges edges.csv [--output road_graph.npz]
+#       nodes.csv  id,lon,lat
+#       edges.csv  u,v,length_m,speed_kmh[,oneway]   (length_m may be empty: straight line;
+#                                                     oneway=1/true/yes adds only u -> v,
+#                                                     parallel edges keep the fastest)
+#   python road_graph.py synthetic [--spacing 0.02]   # jittered grid over northern Algeria, for tests
+#   python road_graph.py trees [--fleet fleet.json] [--points 7.7667,36.9000 ...]
+#   python road_graph.py query 3.0861,36.7372 7.7667,36.9000
+#
+# Adjacency is CSR (indptr / indices / travel time in seconds per edge, at least
+# MIN_EDGE_SECONDS). Points are snapped to their nearest node through a uniform grid
+# index. A reverse Dijkstra tree gives every node's time to one destination, so a query
+# to a destination with a tree is an array lookup (well under a millisecond):
+#
+#   - trees of the known depots and destinations are precomputed with `trees` into
+#     road_graph_trees.npz next to the graph, and loaded with it, so even the first
+#     query of a one-shot process (main.py) is a lookup
+#   - other destinations get a tree from their second query on (the usual case for a
+#     fleet heading to a few places), kept in an LRU of max_trees
+#   - the first query to an unknown destination runs A* with a straight-line (chord)
+#     distance at the graph's top speed as heuristic, tens of milliseconds on a
+#     country-sized graph
+#
+# Trees are built with scipy's Dijkstra (~25 ms on 63k nodes); without scipy a pure
+# Python Dijkstra takes about 7x longer (~170 ms).
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_PATH = os.path.join(current_dir, "road_graph.npz")
+
+# Sparse matrices drop zero entries, so edge times are clamped for A* and trees alike
+MIN_EDGE_SECONDS = 1e-3
+
+EARTH_RADIUS_M = 6371000.0
+
+# Speed for the stretch between a point and its nearest node
+CONNECTOR_SPEED_M_S = 30 / 3.6
+
+
+def unit_vectors(lon, lat):
+    lon, lat = np.radians(lon), np.radians(lat)
+    return np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)
+
+
+def chord_m(lon1, lat1, lon2, lat2):
+    """Straight-line distance through the earth, never longer than the great circle"""
+    x1, y1, z1 = unit_vectors(lon1, lat1)
+    x2, y2, z2 = unit_vectors(lon2, lat2)
+    return EARTH_RADIUS_M * np.sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2 + (z1 - z2) ** 2)
+
+
+def haversine_m(lon1, lat1, lon2, lat2):
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+class RoadGraph:
+    def __init__(self, lon, lat, indptr, indices, seconds, cell_deg=0.02, max_snap_m=2000.0, max_trees=32,
+                 tree_after=2):
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.indptr = np.asarray(indptr, dtype=np.int32)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.seconds = np.maximum(np.asarray(seconds, dtype=np.float32), np.float32(MIN_EDGE_SECONDS))
+        self.max_snap_m = max_snap_m
+        self.max_trees = max_trees
+        self.tree_after = tree_after
+        self._trees = OrderedDict()
+        # Precomputed trees (load_trees), never evicted
+        self._pinned = {}
+        self._target_queries = {}
+        self._reverse = None
+        self._lists = None
+
+        # A* heuristic: no edge covers straight-line distance faster than max_speed
+        sources = np.repeat(np.arange(len(self.lon)), np.diff(self.indptr))
+        straight = chord_m(self.lon[sources], self.lat[sources], self.lon[self.indices], self.lat[self.indices])
+        self.max_speed = float(np.max(straight / self.seconds)) if len(straight) else 1.0
+
+        # Grid index for nearest-node lookups: node ids sorted by cell, cell -> range
+        self.cell_deg = cell_deg
+        self.lon0, self.lat0 = float(self.lon.min()), float(self.lat.min())
+        self.columns = int((self.lon.max() - self.lon0) / cell_deg) + 1
+        self.rows = int((self.lat.max() - self.lat0) / cell_deg) + 1
+        cells = self._cell(self.lon, self.lat)
+        self._cell_nodes = np.argsort(cells, kind="stable").astype(np.int32)
+        self._cell_start = np.searchsorted(cells[self._cell_nodes], np.arange(self.rows * self.columns + 1))
+
+    @classmethod
+    def from_edges(cls, lon, lat, u, v, seconds, **options):
+        """Graph from directed edges u -> v with their travel times, the fastest of parallel edges kept"""
+        u, v, seconds = np.asarray(u), np.asarray(v), np.asarray(seconds)
+        # Sorted by source, target, then time: the first edge of each (u, v) run is the fastest.
+        # Sparse matrices would add parallel edges up, so the trees need them collapsed.
+        order = np.lexsort((seconds, v, u))
+        u, v, seconds = u[order], v[order], seconds[order]
+        first = np.ones(len(u), dtype=bool)
+        first[1:] = (u[1:] != u[:-1]) | (v[1:] != v[:-1])
+        u, v, seconds = u[first], v[first], seconds[first]
+        indptr = np.zeros(len(lon) + 1, dtype=np.int64)
+        np.add.at(indptr, u + 1, 1)
+        return cls(lon, lat, np.cumsum(indptr), v, seconds, **options)
+
+    @classmethod
+    def from_csv(cls, nodes_path, edges_path, **options):
+        with open(nodes_path, newline='') as f:
+            nodes = list(csv.DictReader(f))
+        position = {row["id"]: i for i, row in enumerate(nodes)}
+        lon = np.array([float(row["lon"]) for row in nodes])
+        lat = np.array([float(row["lat"]) for row in nodes])
+
+        u, v, length, speed = [], [], [], []
+        with open(edges_path, newline='') as f:
+            for row in csv.DictReader(f):
+                a, b = position[row["u"]], position[row["v"]]
+                meters = float(row["length_m"]) if row.get("length_m") else float(
+                    haversine_m(lon[a], lat[a], lon[b], lat[b]))
+                kmh = float(row["speed_kmh"])
+                oneway = (row.get("oneway") or "").strip().lower() in ("1", "true", "yes")
+                pairs = [(a, b)] if oneway else [(a, b), (b, a)]
+                for s, t in pairs:
+                    u.append(s)
+                    v.append(t)
+                    length.append(meters)
+                    speed.append(kmh)
+        seconds = np.array(length) / (np.array(speed) / 3.6)
+        return cls.from_edges(lon, lat, np.array(u), np.array(v), seconds, **options)
+
+    @classmethod
+    def synthetic(cls, lon_range=(-1.5, 8.5), lat_range=(34.5, 37.0), spacing=0.02, seed=0, **options):
+        """Jittered grid road network with speeds between 40 and 110 km/h"""
+        rng = np.random.default_rng(seed)
+        columns = int((lon_range[1] - lon_range[0]) / spacing) + 1
+        rows = int((lat_range[1] - lat_range[0]) / spacing) + 1
+        grid_lon, grid_lat = np.meshgrid(np.arange(columns) * spacing + lon_range[0],
+                                         np.arange(rows) * spacing + lat_range[0])
+        lon = (grid_lon + rng.uniform(-0.3, 0.3, grid_lon.shape) * spacing).ravel()
+        lat = (grid_lat + rng.uniform(-0.3, 0.3, grid_lat.shape) * spacing).ravel()
+        ids = np.arange(rows * columns).reshape(rows, columns)
+        a = np.concatenate([ids[:, :-1].ravel(), ids[:-1, :].ravel()])
+        b = np.concatenate([ids[:, 1:].ravel(), ids[1:, :].ravel()])
+        seconds = haversine_m(lon[a], lat[a], lon[b], lat[b]) / (rng.uniform(40, 110, len(a)) / 3.6)
+        return cls.from_edges(lon, lat, np.concatenate([a, b]), np.concatenate([b, a]),
+                              np.concatenate([seconds, seconds]), **options)
+
+    def save(self, path=DEFAULT_PATH):
+        np.savez(path, lon=self.lon, lat=self.lat, indptr=self.indptr, indices=self.indices, seconds=self.seconds)
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH, with_trees=True, **options):
+        """The graph at path, with its precomputed trees (trees_path_for(path)) when they exist"""
+        with np.load(path) as data:
+            graph = cls(data["lon"], data["lat"], data["indptr"], data["indices"], data["seconds"], **options)
+        trees_path = trees_path_for(path)
+        if with_trees and os.path.exists(trees_path):
+            graph.load_trees(trees_path)
+        return graph
+
+    def fingerprint(self):
+        """sha256 of the adjacency, so trees are never applied to another graph"""
+        digest = hashlib.sha256()
+        for array in (self.indptr, self.indices, self.seconds):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+    def save_trees(self, path, points):
+        """Precomputes the trees of the nodes nearest to [lon, lat] points; returns their node ids"""
+        targets = sorted({snapped[0] for snapped in map(self.nearest_node, points) if snapped is not None})
+        trees = np.vstack([self.times_to(target) for target in targets]) if targets else \
+            np.zeros((0, len(self.lon)), dtype=np.float32)
+        np.savez(path, targets=np.array(targets, dtype=np.int32), trees=trees,
+                 meta=json.dumps({"fingerprint": self.fingerprint()}))
+        return targets
+
+    def load_trees(self, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta["fingerprint"] != self.fingerprint():
+                raise RuntimeError(f"{path} was built for another road graph, rebuild it with road_graph.py trees")
+            self._pinned = dict(zip(data["targets"].tolist(), data["trees"]))
+
+    def _cell(self, lon, lat):
+        column = np.clip(((lon - self.lon0) / self.cell_deg).astype(np.int64), 0, self.columns - 1)
+        row = np.clip(((lat - self.lat0) / self.cell_deg).astype(np.int64), 0, self.rows - 1)
+        return row * self.columns + column
+
+    def nearest_node(self, point):
+        """(node, distance in meters) of the node closest to [lon, lat], None beyond max_snap_m"""
+        lon, lat = point
+        column = int((lon - self.lon0) // self.cell_deg)
+        row = int((lat - self.lat0) // self.cell_deg)
+        max_ring = int(self.max_snap_m / (111320.0 * self.cell_deg * max(math.cos(math.radians(lat)), 0.1))) + 1
+        found_at = None
+        candidates = []
+        for ring in range(max_ring + 1):
+            for r in range(row - ring, row + ring + 1):
+                if not 0 <= r < self.rows:
+                    continue
+                for c in range(column - ring, column + ring + 1):
+                    # Only the border of the ring, inner cells were searched already
+                    if 0 <= c < self.columns and (abs(r - row) == ring or abs(c - column) == ring):
+                        cell = r * self.columns + c
+                        start, end = self._cell_start[cell], self._cell_start[cell + 1]
+                        if end > start:
+                            candidates.append(self._cell_nodes[start:end])
+            if candidates and found_at is None:
+                found_at = ring
+            # A closer node can sit one ring further out than the first hit
+            if found_at is not None and ring > found_at:
+                break
+        if not candidates:
+            return None
+        nodes = np.concatenate(candidates)
+        distances = haversine_m(lon, lat, self.lon[nodes], self.lat[nodes])
+        best = int(np.argmin(distances))
+        if distances[best] > self.max_snap_m:
+            return None
+        return int(nodes[best]), float(distances[best])
+
+    def _search_lists(self):
+        # The search loops run on Python lists, much faster to index one at a time than
+        # arrays; built on the first search, lookups in precomputed trees never need them
+        if self._lists is None:
+            x, y, z = unit_vectors(self.lon, self.lat)
+            self._lists = ((self.indptr.tolist(), self.indices.tolist(), self.seconds.astype(np.float64).tolist()),
+                           (x.tolist(), y.tolist(), z.tolist()))
+        return self._lists
+
+    def shortest_time(self, source, target):
+        """A* travel time in seconds between two nodes, None when unreachable"""
+        if source == target:
+            return 0.0
+        (indptr, indices, seconds), (xs, ys, zs) = self._search_lists()
+        tx, ty, tz = xs[target], ys[target], zs[target]
+        scale = EARTH_RADIUS_M / self.max_speed
+        sqrt, push, pop = math.sqrt, heapq.heappush, heapq.heappop
+
+        best = {source: 0.0}
+        heap = [(0.0, 0.0, source)]
+        while heap:
+            _, time_u, u = pop(heap)
+            if u == target:
+                return time_u
+            if time_u > best[u]:
+                continue
+            for k in range(indptr[u], indptr[u + 1]):
+                v = indices[k]
+                time_v = time_u + seconds[k]
+                if time_v < best.get(v, math.inf):
+                    best[v] = time_v
+                    dx, dy, dz = xs[v] - tx, ys[v] - ty, zs[v] - tz
+                    push(heap, (time_v + scale * sqrt(dx * dx + dy * dy + dz * dz), time_v, v))
+        return None
+
+    def _reverse_graph(self):
+        if self._reverse is None:
+            sources = np.repeat(np.arange(len(self.lon), dtype=np.int32), np.diff(self.indptr))
+            order = np.argsort(self.indices, kind="stable")
+            indptr = np.concatenate([[0], np.cumsum(np.bincount(self.indices, minlength=len(self.lon)))])
+            self._reverse = (indptr, sources[order], self.seconds[order])
+        return self._reverse
+
+    def times_to(self, target):
+        """Travel time in seconds from every node to target (inf when unreachable), kept in an LRU"""
+        tree = self._pinned.get(target)
+        if tree is not None:
+            return tree
+        tree = self._trees.get(target)
+        if tree is not None:
+            self._trees.move_to_end(target)
+            return tree
+        indptr, indices, seconds = self._reverse_graph()
+        if csr_matrix is not None:
+            n = len(self.lon)
+            # Edge times are at least MIN_EDGE_SECONDS, so no edge vanishes from the sparse matrix
+            matrix = csr_matrix((seconds, indices, indptr), shape=(n, n))
+            tree = dijkstra(matrix, indices=target).astype(np.float32)
+        else:
+            tree = self._dijkstra(indptr.tolist(), indices.tolist(), seconds.tolist(), target)
+        self._trees[target] = tree
+        while len(self._trees) > self.max_trees:
+            self._trees.popitem(last=False)
+        return tree
+
+    def _dijkstra(self, indptr, indices, seconds, source):
+        times = [math.inf] * len(self.lon)
+        times[source] = 0.0
+        heap = [(0.0, source)]
+        while heap:
+            time_u, u = heapq.heappop(heap)
+            if time_u > times[u]:
+                continue
+            for k in range(indptr[u], indptr[u + 1]):
+                time_v = time_u + seconds[k]
+                if time_v < times[indices[k]]:
+                    times[indices[k]] = time_v
+                    heapq.heappush(heap, (time_v, indices[k]))
+        return np.array(times, dtype=np.float32)
+
+    def eta(self, start, end):
+        """
+        Seconds from [lon, lat] start to end, None when a point is off the graph or no
+        route exists. A lookup for a destination with a precomputed tree, otherwise A* for
+        a new destination and its tree from the tree_after-th query on.
+        """
+        snapped = self.nearest_node(start), self.nearest_node(end)
+        if None in snapped:
+            return None
+        (source, source_m), (target, target_m) = snapped
+        queries = self._target_queries[target] = self._target_queries.get(target, 0) + 1
+        if target in self._pinned or target in self._trees or queries >= self.tree_after:
+            seconds = float(self.times_to(target)[source])
+        else:
+            seconds = self.shortest_time(source, target)
+        if seconds is None or math.isinf(seconds):
+            return None
+        return seconds + (source_m + target_m) / CONNECTOR_SPEED_M_S
+
+    def matrix(self, sources, destinations):
+        """Seconds for every source x destination, through one tree per destination"""
+        snapped_sources = [self.nearest_node(point) for point in sources]
+        rows = [[None] * len(destinations) for _ in sources]
+        for column, end in enumerate(destinations):
+            snapped = self.nearest_node(end)
+            if snapped is None:
+                continue
+            target, target_m = snapped
+            tree = self.times_to(target)
+            for row, source in enumerate(snapped_sources):
+                if source is not None and not math.isinf(tree[source[0]]):
+                    rows[row][column] = float(tree[source[0]]) + (source[1] + target_m) / CONNECTOR_SPEED_M_S
+        return rows
+
+    def stats(self):
+        return {"nodes": len(self.lon), "edges": len(self.indices), "max_speed_kmh": self.max_speed * 3.6,
+                "trees": len(self._trees), "precomputed_trees": len(self._pinned)}
+
+
+def trees_path_for(graph_path):
+    return os.path.splitext(graph_path)[0] + "_trees.npz"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the offline road graph")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Compile a node/edge list into the graph file")
+    build.add_argument("--nodes", required=True)
+    build.add_argument("--edges", required=True)
+    build.add_argument("--output", default=DEFAULT_PATH)
+    synthetic = commands.add_parser("synthetic", help="Write a synthetic graph for tests")
+    synthetic.add_argument("--spacing", type=float, default=0.02)
+    synthetic.add_argument("--output", default=DEFAULT_PATH)
+    trees = commands.add_parser("trees", help="Precompute the trees of known destinations")
+    trees.add_argument("--graph", default=os.getenv("ROAD_GRAPH_PATH", DEFAULT_PATH))
+    trees.add_argument("--fleet", help="Fleet file (see fleet_monitor.py), its vehicles' destinations")
+    trees.add_argument("--points", nargs="*", default=[], help="lon,lat of depots or other destinations")
+    trees.add_argument("--output", help="Trees file (default: next to the graph)")
+    query = commands.add_parser("query", help="ETA between two lon,lat points")
+    query.add_argument("start")
+    query.add_argument("end")
+    query.add_argument("--graph", default=os.getenv("ROAD_GRAPH_PATH", DEFAULT_PATH))
+    args = parser.parse_args()
+
+    if args.command == "trees":
+        graph = RoadGraph.load(args.graph, with_trees=False)
+        points = [[float(value) for value in point.split(",")] for point in args.points]
+        if args.fleet:
+            with open(args.fleet, 'r') as f:
+                points += [vehicle["destination"] for vehicle in json.load(f)]
+        if not points:
+            parser.error("trees needs --fleet or --points")
+        output = args.output or trees_path_for(args.graph)
+        targets = graph.save_trees(output, points)
+        print(f"{len(targets)} trees ({len(targets) * len(graph.lon) * 4 / 1e6:.1f} MB) -> {output}")
+    elif args.command == "query":
+        graph = RoadGraph.load(args.graph)
+        start, end = ([float(value) for value in point.split(",")] for point in (args.start, args.end))
+        print(graph.eta(start, end))
+    else:
+        if args.command == "build":
+            graph = RoadGraph.from_csv(args.nodes, args.edges)
+        else:
+            graph = RoadGraph.synthetic(spacing=args.spacing)
+        graph.save(args.output)
+        print(f"{graph.stats()} -> {args.output}")
@@ -0,0 +1,262 @@
+import asyncio
+import itertools
+import sys
+import httpx
+from main import API_KEY, ROUTING_URL, eta_cache, get_road_graph
+from routing_stub import route_summary
+
+# Routing backends for the fleet monitor and the routing benchmark. A backend answers
+# one origin -> destination pair (route) or every sources x destinations pair in one
+# request (matrix); durations are in seconds, None when unavailable.
+#
+#   ors     OpenRouteService HTTP API, or routing_stub.py through ROUTING_URL
+#   local   the stub's duration model computed in-process, no HTTP (tests, dry runs)
+#   graph   the offline road graph (road_graph.py), with the ors backend for the pairs
+#           it cannot route (points off the graph)
+#
+# Router puts the ETA cache in front of a backend and either resolves pairs one by one
+# or packs the cache misses into matrix requests (eta_batches).
+
+SHARD_CONNECTIONS = 10
+
+# OpenRouteService rejects matrix requests with more than 3500 sources x destinations
+ORS_MAX_ELEMENTS = 3500
+
+
+class OrsBackend:
+    """
+    OpenRouteService API over at most `connections` connections, split over several
+    httpx clients of SHARD_CONNECTIONS each. httpx rescans every queued request against
+    every connection of a client whenever one is released, which costs more CPU than
+    the requests themselves with large pools, so each shard stays small and requests
+    wait on the shard's semaphore instead of in the httpx queue.
+    """
+    name = "ors"
+
+    def __init__(self, url=ROUTING_URL, api_key=API_KEY, connections=20, timeout=30.0,
+                 max_elements=ORS_MAX_ELEMENTS):
+        self.url = url
+        self.headers = {"Authorization": api_key, "Content-Type": "application/json"}
+        self.max_elements = max_elements
+        self.shards = []
+        for start in range(0, connections, SHARD_CONNECTIONS):
+            size = min(SHARD_CONNECTIONS, connections - start)
+            limits = httpx.Limits(max_connections=size, max_keepalive_connections=size)
+            self.shards.append((httpx.AsyncClient(limits=limits, timeout=timeout), asyncio.Semaphore(size)))
+        self._next_shard = itertools.count()
+        self.calls = 0
+
+    async def post(self, path, body, index=None):
+        """Response JSON, None on failure"""
+        index = next(self._next_shard) if index is None else index
+        client, slots = self.shards[index % len(self.shards)]
+        self.calls += 1
+        try:
+            async with slots:
+                response = await client.post(f"{self.url}{path}", headers=self.headers, json=body)
+        except httpx.HTTPError as e:
+            print(f"Error: {type(e).__name__} {e}", file=sys.stderr)
+            return None
+        if response.status_code == 200:
+            return response.json()
+        print("Error:", response.status_code, response.text, file=sys.stderr)
+        return None
+
+    async def route(self, start, end, index=None):
+        """Async counterpart of main.get_eta"""
+        data = await self.post("/v2/directions/driving-car", {
+            "coordinates": [start, end],
+            "units": "m",
+            "instructions": False
+        }, index)
+        return data["routes"][0]["summary"]["duration"] if data else None
+
+    async def matrix(self, sources, destinations):
+        data = await self.post("/v2/matrix/driving-car", {
+            "locations": sources + destinations,
+            "sources": list(range(len(sources))),
+            "destinations": list(range(len(sources), len(sources) + len(destinations))),
+            "metrics": ["duration"]
+        })
+        if data is None:
+            return [[None] * len(destinations) for _ in sources]
+        return data["durations"]
+
+    async def aclose(self):
+        for client, _ in self.shards:
+            await client.aclose()
+
+
+class LocalBackend:
+    """In-process stand-in with the durations of routing_stub.py"""
+    name = "local"
+
+    def __init__(self, max_elements=ORS_MAX_ELEMENTS, **_):
+        self.max_elements = max_elements
+        self.calls = 0
+
+    async def route(self, start, end, index=None):
+        self.calls += 1
+        return route_summary(start, end)["duration"]
+
+    async def matrix(self, sources, destinations):
+        self.calls += 1
+        return [[route_summary(start, end)["duration"] for end in destinations] for start in sources]
+
+    async def aclose(self):
+        pass
+
+
+class GraphBackend:
+    """Offline road graph, falling back to the HTTP API; calls counts the fallback's requests"""
+    name = "graph"
+
+    def __init__(self, graph=None, fallback=None, max_elements=ORS_MAX_ELEMENTS, **options):
+        self.graph = graph if graph is not None else get_road_graph()
+        if self.graph is None:
+            raise RuntimeError("No road graph, build one with road_graph.py or set ROAD_GRAPH_PATH")
+        self.fallback = fallback if fallback is not None else OrsBackend(max_elements=max_elements, **options)
+        self.max_elements = max_elements
+        self.offline = 0
+
+    @property
+    def calls(self):
+        return self.fallback.calls
+
+    async def route(self, start, end, index=None):
+        duration = self.graph.eta(start, end)
+        if duration is not None:
+            self.offline += 1
+            return duration
+        return await self.fallback.route(start, end, index)
+
+    async def matrix(self, sources, destinations):
+        durations = self.graph.matrix(sources, destinations)
+        missing = [(row, column) for row, values in enumerate(durations)
+                   for column, duration in enumerate(values) if duration is None]
+        self.offline += len(sources) * len(destinations) - len(missing)
+        if missing:
+            rows = sorted({row for row, _ in missing})
+            columns = sorted({column for _, column in missing})
+            fallback = await self.fallback.matrix([sources[row] for row in rows],
+                                                  [destinations[column] for column in columns])
+            for row, column in missing:
+                durations[row][column] = fallback[rows.index(row)][columns.index(column)]
+        return durations
+
+    async def aclose(self):
+        await self.fallback.aclose()
+
+
+BACKENDS = {"ors": OrsBackend, "local": LocalBackend, "graph": GraphBackend}
+
+
+def plan_batches(pairs, max_elements):
+    """
+    Packs (start, end) pairs into matrix requests of at most max_elements cells:
+    pairs are grouped by destination, and destination groups are added to a request
+    while sources x destinations still fits. Returns (sources, destinations, cells)
+    per request, cells being (pair index, source row, destination column).
+    """
+    by_destination = {}
+    for i, (start, end) in enumerate(pairs):
+        by_destination.setdefault(tuple(end), []).append(i)
+
+    batches = []
+    sources, destinations, cells = {}, {}, []
+
+    def flush():
+        if cells:
+            batches.append(([list(s) for s in sources], [list(d) for d in destinations], list(cells)))
+        sources.clear()
+        destinations.clear()
+        cells.clear()
+
+    for end, indices in by_destination.items():
+        for first in range(0, len(indices), max_elements):
+            group = indices[first:first + max_elements]
+            new_sources = {tuple(pairs[i][0]) for i in group}.difference(sources)
+            if (len(sources) + len(new_sources)) * (len(destinations) + 1) > max_elements:
+                flush()
+            column = destinations.setdefault(end, len(destinations))
+            for i in group:
+                row = sources.setdefault(tuple(pairs[i][0]), len(sources))
+                cells.append((i, row, column))
+    flush()
+    return batches
+
+
+class Router:
+    """ETA lookups on a backend, behind the persistent ETA cache (see eta_cache.py)"""
+
+    def __init__(self, backend, cache=eta_cache):
+        self.backend = backend
+        self.cache = cache
+        self.in_flight = {}
+        self.coalesced = 0
+
+    def route_key(self, start, end, planned=False):
+        if self.cache is not None:
+            return self.cache.route_key(start, end, planned)
+        return planned, tuple(start), tuple(end)
+
+    async def eta(self, start, end, planned=False, index=None):
+        """One planned or live leg; concurrent misses on the same route share one backend call"""
+        if self.cache is None:
+            return await self.backend.route(start, end, index)
+        duration = self.cache.get(start, end, planned)
+        if duration is not None:
+            return duration
+        key = self.cache.route_key(start, end, planned)
+        pending = self.in_flight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await pending
+        pending = self.in_flight[key] = asyncio.ensure_future(self.backend.route(start, end, index))
+        try:
+            duration = await pending
+        finally:
+            del self.in_flight[key]
+        if duration is not None:
+            self.cache.put(start, end, duration, planned)
+        return duration
+
+    async def eta_batches(self, pairs, planned=None):
+        """
+        Many pairs at once: yields {pair index: duration} for the cache hits, then once
+        per matrix request as the requests complete. planned flags the pairs that are
+        planned legs (default: none). Pairs on the same (snapped) route and of the same
+        class are requested once.
+        """
+        planned = planned or [False] * len(pairs)
+        resolved = {}
+        missing = {}
+        for i, (start, end) in enumerate(pairs):
+            duration = self.cache.get(start, end, planned[i]) if self.cache is not None else None
+            if duration is not None:
+                resolved[i] = duration
+            else:
+                missing.setdefault(self.route_key(start, end, planned[i]), []).append(i)
+        if resolved:
+            yield resolved
+
+        routes = list(missing.values())
+        unique = [pairs[indices[0]] for indices in routes]
+        batches = plan_batches(unique, self.backend.max_elements)
+        requests = [asyncio.ensure_future(self._run_batch(batch)) for batch in batches]
+        for finished in asyncio.as_completed(requests):
+            resolved = {}
+            for route, duration in await finished:
+                if duration is not None and self.cache is not None:
+                    self.cache.put(*unique[route], duration, planned[routes[route][0]])
+                for i in routes[route]:
+                    resolved[i] = duration
+            yield resolved
+
+    async def _run_batch(self, batch):
+        sources, destinations, cells = batch
+        durations = await self.backend.matrix(sources, destinations)
+        return [(i, durations[row][column]) for i, row, column in cells]
+
+    async def aclose(self):
+        await self.backend.aclose()
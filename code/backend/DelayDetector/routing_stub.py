@@ -0,0 +1,115 @@
+import argparse
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the OpenRouteService directions and matrix APIs, to run
+# DelayDetector and the fleet monitor without network access or API quota:
+#
+#   python routing_stub.py [--port 8090] [--latency-ms 50]
+#   ROUTING_URL=http://127.0.0.1:8090 python fleet_monitor.py --fleet fleet.json
+#
+# Durations are deterministic: great-circle distance times a road factor, driven at a
+# constant speed. --latency-ms adds a fixed delay per request to mimic the real API, and
+# matrix requests above --max-elements sources x destinations are rejected like ORS does.
+# GET /stats returns the number of requests served.
+
+EARTH_RADIUS_M = 6371000.0
+ROAD_FACTOR = 1.3
+SPEED_M_S = 80 / 3.6
+
+
+def haversine_m(start, end):
+    """Great-circle distance in meters between two [lon, lat] points"""
+    lon1, lat1, lon2, lat2 = map(math.radians, (*start, *end))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def route_summary(start, end):
+    distance = haversine_m(start, end) * ROAD_FACTOR
+    return {"distance": distance, "duration": distance / SPEED_M_S}
+
+
+class RoutingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Send headers and body as one segment, without waiting for delayed ACKs
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+    latency = 0.0
+    max_elements = 3500
+    requests_served = 0
+    lock = threading.Lock()
+
+    def send_json(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self.send_json(200, {"requests": RoutingHandler.requests_served})
+        else:
+            self.send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with RoutingHandler.lock:
+            RoutingHandler.requests_served += 1
+        if self.latency:
+            time.sleep(self.latency)
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return self.send_json(400, {"error": "Invalid JSON"})
+
+        if self.path.startswith("/v2/directions/"):
+            coordinates = payload.get("coordinates") or []
+            if len(coordinates) < 2:
+                return self.send_json(400, {"error": "At least two coordinates are required"})
+            legs = [route_summary(a, b) for a, b in zip(coordinates, coordinates[1:])]
+            summary = {key: sum(leg[key] for leg in legs) for key in ("distance", "duration")}
+            return self.send_json(200, {"routes": [{"summary": summary}]})
+        if self.path.startswith("/v2/matrix/"):
+            locations = payload.get("locations") or []
+            sources = payload.get("sources") or list(range(len(locations)))
+            destinations = payload.get("destinations") or list(range(len(locations)))
+            if len(sources) * len(destinations) > self.max_elements:
+                return self.send_json(400, {"error": f"Request exceeds {self.max_elements} routes"})
+            durations = [[route_summary(locations[s], locations[d])["duration"] for d in destinations]
+                         for s in sources]
+            return self.send_json(200, {"durations": durations})
+        self.send_json(404, {"error": "Not found"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RoutingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for a whole fleet's connection pool connecting at once
+    request_queue_size = 1024
+
+
+def serve(host="127.0.0.1", port=8090, latency_ms=0.0, max_elements=3500):
+    RoutingHandler.latency = latency_ms / 1000.0
+    RoutingHandler.max_elements = max_elements
+    return RoutingServer((host, port), RoutingHandler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenRouteService API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--max-elements", type=int, default=3500)
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.latency_ms, args.max_elements)
+    print(f"Routing stub listening on http://{args.host}:{args.port}")
+    server.serve_forever()